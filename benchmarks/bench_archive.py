@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""create_archive_index の全再生成と1日追加（マニフェスト利用）の比較
+
+    python benchmarks/bench_archive.py
+"""
+import contextlib
+import datetime
+import io
+import os
+import shutil
+import time
+
+from stubs import load_scraper, make_dictionary
+
+
+def seed_archive(n_days):
+    """n日分の空ページを archive/ に置く"""
+    shutil.rmtree("archive", ignore_errors=True)
+    os.makedirs("archive")
+    start = datetime.date(2000, 1, 1)
+    for i in range(n_days):
+        open(f"archive/news_{start + datetime.timedelta(days=i)}.html", "w").close()
+    return start + datetime.timedelta(days=n_days)
+
+
+def timed(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        fn(*args)
+        return time.perf_counter() - start
+
+
+def main():
+    nsf = load_scraper(make_dictionary())
+    print(f"{'days':>6} {'rebuild(ms)':>12} {'add day(ms)':>12} {'index.html(KB)':>15}")
+    for n in (10, 1000, 10000):
+        next_day = seed_archive(n)
+        rebuild = timed(nsf.create_archive_index)
+        add = timed(nsf.create_archive_index, str(next_day))
+        size = os.path.getsize("archive/index.html") / 1024
+        print(f"{n:>6} {rebuild * 1000:>12.1f} {add * 1000:>12.1f} {size:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
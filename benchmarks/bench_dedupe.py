@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""dedupe_articles の近似重複除去をアーカイブ記事で検証・計測する
+
+archive/data/news_*.json の記事に「末尾 ...」「サイト名付き」の転載コピーを混ぜ、
+除去件数と処理時間を記事数ごとに出す。
+
+    python benchmarks/bench_dedupe.py
+"""
+import contextlib
+import io
+import random
+import time
+
+from stubs import archived_articles, load_scraper, make_dictionary
+
+
+def syndicated_copy(a, rng):
+    """転載先でタイトルが少し変わったコピー"""
+    title = a["title"].rstrip(" .…")
+    title = rng.choice([title + " ...", title + " - MSN", title + "｜ORICON NEWS"])
+    return {**a, "title": title, "url": a["url"] + "?copy=1"}
+
+
+def corpus(n, base, rng):
+    """アーカイブの文字分布から作ったn件の別記事と、その半数の転載コピー
+
+    URLは記事ごとに別にする（同じURLだと近似重複の段に届く前にURLで落ちる）
+    """
+    chars = [ch for a in base for ch in a["title"] + a["snippet"] if not ch.isspace()]
+    originals = []
+    for i in range(n):
+        a = base[i % len(base)]
+        originals.append({
+            **a,
+            "title": "".join(rng.choices(chars, k=30)),
+            "snippet": "".join(rng.choices(chars, k=120)),
+            "url": f"https://example.com/news/{i}",
+        })
+    copies = [syndicated_copy(a, rng) for a in rng.sample(originals, n // 2)]
+    mixed = originals + copies
+    rng.shuffle(mixed)
+    return mixed, len(copies)
+
+
+def main():
+    nsf = load_scraper(make_dictionary())
+    rng = random.Random(0)
+    base = archived_articles()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        kept = nsf.dedupe_articles(base)
+    print(f"archive: {len(base)} 件 → {len(kept)} 件")
+
+    print(f"{'articles':>8} {'copies':>7} {'removed':>8} {'time(ms)':>9}")
+    for n in (100, 1000, 5000):
+        mixed, n_copies = corpus(n, base, rng)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            kept = nsf.dedupe_articles(mixed)
+            elapsed = time.perf_counter() - start
+        print(f"{len(mixed):>8} {n_copies:>7} {len(mixed) - len(kept):>8} {elapsed * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
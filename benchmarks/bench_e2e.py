@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""main() 全体をオフラインで計測する（RSS と Ollama はローカルスタブ）
+
+クエリ数×件数の規模ごとに、取得からアーカイブ一覧・検索インデックス・Page2 までを
+実行し、ステージ別の時間（write_metrics の記録）とピークメモリを JSON に残す。
+--compare で以前の結果と並べて差分を出す。
+
+    python benchmarks/bench_e2e.py [--scales 10x10 40x20 100x50] [--latency 0.02]
+                                   [--feed-dir 保存したRSSのディレクトリ]
+                                   [--output results.json] [--compare old.json]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from stubs import (REPO_ROOT, load_scraper, make_dictionary, recorded_feed,
+                   start_ollama_server, start_rss_server, synthetic_feed)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(rss_url, ollama_url, n_queries, trace):
+    """新しい作業ディレクトリで main() を1回実行し (経過秒, ピークバイト, ステージ記録) を返す"""
+    nsf = load_scraper(make_dictionary(n_queries, {"ollama_summaries": True}))
+    nsf.BING_RSS_URL = rss_url
+    nsf.OLLAMA_URL = ollama_url
+    nsf.USE_OLLAMA = True
+    for q in nsf.CONFIG.queries:
+        q["max_items"] = 1000  # 件数はスタブ側で決める
+
+    peak = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        nsf.main()
+        elapsed = time.perf_counter() - start
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    with open(nsf.CONFIG.metrics_file, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    return elapsed, peak, records
+
+
+def summarize(records):
+    """ステージごとに時間と件数をまとめる（fetch_query などは合計と最大）"""
+    stages = {}
+    for r in records:
+        row = stages.setdefault(r["stage"], {"seconds": 0.0, "max_seconds": 0.0, "calls": 0,
+                                             "items": 0, "bytes": 0, "cache_hits": 0, "cache_misses": 0})
+        row["seconds"] += r["seconds"]
+        row["max_seconds"] = max(row["max_seconds"], r["seconds"])
+        row["calls"] += 1
+        for key in ("items", "bytes", "cache_hits", "cache_misses"):
+            row[key] += r[key]
+    return stages
+
+
+def run_scale(n_queries, n_items, args):
+    if args.feed_dir:
+        feed = recorded_feed(glob.glob(os.path.join(args.feed_dir, "*.xml")))
+    else:
+        feed = synthetic_feed(n_items)
+    rss, rss_url = start_rss_server(latency=args.latency, feed=feed)
+    ollama, ollama_url = start_ollama_server(latency=args.ollama_latency)
+    try:
+        runs = [run_pipeline(rss_url, ollama_url, n_queries, trace=False) for _ in range(args.repeat)]
+        _, peak, _ = run_pipeline(rss_url, ollama_url, n_queries, trace=True)
+    finally:
+        rss.shutdown()
+        ollama.shutdown()
+
+    elapsed, _, records = sorted(runs, key=lambda run: run[0])[len(runs) // 2]  # 中央値の回
+    stages = summarize(records)
+    return {
+        "queries": n_queries,
+        "items": n_items,
+        "fetched": stages.get("fetch", {}).get("items", 0),
+        "published": stages.get("classify", {}).get("items", 0),
+        "seconds": round(elapsed, 4),
+        "peak_kb": peak // 1024,
+        "ollama_requests": len(ollama.requests) // (args.repeat + 1),  # 1回あたり
+        "stages": stages,
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["queries"], r["items"]): r for r in baseline["results"]}
+    print(f"\n比較: {baseline_path}（{baseline['meta'].get('revision')}）")
+    for r in results:
+        before = old.get((r["queries"], r["items"]))
+        if not before:
+            continue
+        print(f"  {r['queries']}x{r['items']}: {before['seconds']:.2f}s → {r['seconds']:.2f}s "
+              f"({(r['seconds'] / before['seconds'] - 1) * 100:+.0f}%), "
+              f"peak {before['peak_kb']} → {r['peak_kb']} KB")
+        for name, row in r["stages"].items():
+            was = before["stages"].get(name, {}).get("seconds")
+            if was and abs(row["seconds"] - was) > max(0.005, was * 0.2):
+                print(f"    {name:<14} {was * 1000:>8.1f} → {row['seconds'] * 1000:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", default=["10x10", "40x20", "100x50"],
+                        help="クエリ数x1クエリあたりの件数")
+    parser.add_argument("--latency", type=float, default=0.02, help="RSSスタブの応答遅延（秒）")
+    parser.add_argument("--ollama-latency", type=float, default=0.05)
+    parser.add_argument("--feed-dir", help="保存済みRSS（*.xml）をクエリごとに順番に返す")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="結果JSONの保存先")
+    parser.add_argument("--compare", help="比較する以前の結果JSON")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'scale':>8} {'fetched':>8} {'pub':>6} {'total(s)':>9} {'peak(KB)':>9}  主なステージ(ms)")
+    for scale in args.scales:
+        n_queries, n_items = (int(x) for x in scale.split("x"))
+        r = run_scale(n_queries, n_items, args)
+        results.append(r)
+        top = sorted(r["stages"].items(), key=lambda kv: -kv[1]["seconds"])
+        top = [(name, row) for name, row in top if name not in ("fetch_query", "parse")][:4]
+        print(f"{scale:>8} {r['fetched']:>8} {r['published']:>6} {r['seconds']:>9.2f} {r['peak_kb']:>9}  "
+              + " ".join(f"{name}={row['seconds'] * 1000:.0f}" for name, row in top))
+
+    output = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "latency": args.latency,
+            "ollama_latency": args.ollama_latency,
+            "feed": args.feed_dir or "synthetic",
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"\n保存: {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
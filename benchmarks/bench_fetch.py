@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""fetch_all_news の壁時計時間をクエリ数ごとに計測する
+
+    python benchmarks/bench_fetch.py [--latency 0.1]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from stubs import load_scraper, make_dictionary, start_rss_server
+
+
+def run(n_queries, latency, workers):
+    server, url = start_rss_server(latency=latency)
+    try:
+        nsf = load_scraper(make_dictionary(n_queries, {"fetch_workers": workers}))
+        nsf.BING_RSS_URL = url
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            articles = nsf.fetch_all_news()
+            elapsed = time.perf_counter() - start
+        return elapsed, len(articles)
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"latency={args.latency}s")
+    print(f"{'queries':>8} {'serial(s)':>10} {'pooled(s)':>10} {'articles':>9}")
+    for n in (10, 20, 40, 60):
+        serial, _ = run(n, args.latency, workers=1)
+        pooled, count = run(n, args.latency, workers=8)
+        print(f"{n:>8} {serial:>10.2f} {pooled:>10.2f} {count:>9}")
+
+
+if __name__ == "__main__":
+    main()
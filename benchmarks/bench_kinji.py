@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""金次コメント選択：従来の pick_unique_comment と KinjiDeck の比較（コメント数ごと）
+
+    python benchmarks/bench_kinji.py [--cards 1000]
+"""
+import argparse
+import random
+import time
+
+from stubs import load_scraper, make_dictionary
+
+
+def make_picker(kinji_comments):
+    """変更前の pick_unique_comment（_used_comments は実行ごとに空から）"""
+    used_comments = {}
+
+    def pick(category):
+        if category not in kinji_comments:
+            category = "その他"
+        comments = [c.get("comment_text", "") for c in kinji_comments.get(category, [])]
+        if not comments:
+            return ""
+        used = used_comments.setdefault(category, set())
+        remain = [c for c in comments if c not in used]
+        if not remain:
+            used.clear()
+            remain = comments[:]
+        chosen = random.choice(remain)
+        used.add(chosen)
+        return chosen
+    return pick
+
+
+def timed(pick, cards):
+    start = time.perf_counter()
+    for i in range(cards):
+        pick("ホロライブ" if i % 2 else "その他")
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=1000)
+    args = parser.parse_args()
+
+    nsf = load_scraper(make_dictionary())
+    print(f"{args.cards}枚")
+    print(f"{'comments':>8} {'loop(ms)':>9} {'deck(ms)':>9}")
+    for n in (10, 100, 1000, 10000):
+        kinji_comments = {
+            category: [{"comment_text": f"{category} {i}"} for i in range(n)]
+            for category in ("ホロライブ", "その他")
+        }
+        loop = timed(make_picker(kinji_comments), args.cards)
+        deck = timed(nsf.KinjiDeck(kinji_comments).draw, args.cards)
+        print(f"{n:>8} {loop:>9.1f} {deck:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""KeywordMatcher と従来のキーワード総当たりの比較（辞書100〜1万語）
+
+    python benchmarks/bench_match.py [--articles 500]
+"""
+import argparse
+import random
+import time
+
+from stubs import load_scraper, make_dictionary
+
+
+def classify_loop(keywords, text, default):
+    """変更前の classify_by_keyword"""
+    for row in keywords:
+        keyword = str(row.get("keyword", "")).lower()
+        if keyword and keyword in text:
+            return row.get("category", "")
+    return default
+
+
+def tags_loop(tag_rules, text):
+    """変更前の extract_tags"""
+    tags = []
+    for label, words in tag_rules:
+        for keyword in words:
+            if keyword.lower() in text:
+                tags.append(label)
+                break
+    return list(dict.fromkeys(tags))[:3]
+
+
+def synthetic_keywords(n, rng):
+    alphabet = "ホロライブにじさんじ個人勢コラボ新衣装配信卒業abcdefghijklmnopqrstuvwxyz"
+    return [
+        {"keyword": "".join(rng.choice(alphabet) for _ in range(rng.randint(2, 6))),
+         "category": f"cat{i % 7}"}
+        for i in range(n)
+    ]
+
+
+def synthetic_texts(n, rng, keywords):
+    texts = []
+    for i in range(n):
+        words = [rng.choice(keywords)["keyword"] for _ in range(2)]
+        texts.append((f"VTuber {words[0]} ニュース {i} 新衣装お披露目 EN overseas ",
+                      f"配信 {words[1]} の話題 " * 8))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    nsf = load_scraper(make_dictionary())
+    print(f"{'keywords':>8} {'build(ms)':>10} {'loop(ms)':>9} {'matcher(ms)':>12}")
+    for n in (100, 1000, 10000):
+        keywords = synthetic_keywords(n, rng)
+        texts = synthetic_texts(args.articles, rng, keywords)
+
+        start = time.perf_counter()
+        matcher = nsf.KeywordMatcher(keywords, nsf.TAG_RULES)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = []
+        for title, snippet in texts:
+            text = (title + " " + snippet).lower()
+            expected.append((classify_loop(keywords, text, "その他"), tags_loop(nsf.TAG_RULES, text)))
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        got = [matcher.match((title + " " + snippet).lower(), "その他") for title, snippet in texts]
+        single = time.perf_counter() - start
+
+        assert got == expected
+        print(f"{n:>8} {build * 1000:>10.1f} {loop * 1000:>9.1f} {single * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
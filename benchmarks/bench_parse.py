@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""parse_rss（lxml逐次パース）と従来の BeautifulSoup 経路の比較
+
+archive/data/news_*.json の記事から RSS を再構成して使う。
+
+    python benchmarks/bench_parse.py [--repeat 50]
+"""
+import argparse
+import glob
+import json
+import os
+import timeit
+from xml.sax.saxutils import escape
+
+from bs4 import BeautifulSoup
+
+from stubs import REPO_ROOT, load_scraper, make_dictionary
+
+
+def parse_rss_bs4(text, max_items):
+    """変更前の fetch_all_news と同じ BeautifulSoup 経路（URLは未正規化のまま）"""
+    soup = BeautifulSoup(text, "xml")
+    articles = []
+    for item in soup.find_all("item")[:max_items]:
+        articles.append({
+            "title": item.title.text if item.title else "タイトルなし",
+            "url": item.link.text if item.link else "#",
+            "snippet": item.description.text if item.description else "説明なし",
+            "date": item.pubDate.text if item.pubDate else "",
+        })
+    return articles
+
+
+def archived_feeds():
+    """アーカイブ済みの記事から1日1本のRSSを組み立てる"""
+    feeds = []
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, "archive", "data", "news_*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            articles = json.load(f)["articles"]
+        items = "".join(
+            f"<item><title>{escape(a['title'])}</title><link>{escape(a['url'])}</link>"
+            f"<description>{escape(a['snippet'])}</description>"
+            f"<pubDate>{escape(a['date'])}</pubDate></item>"
+            for a in articles
+        )
+        body = f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>{items}</channel></rss>'
+        feeds.append((os.path.basename(path), body.encode("utf-8"), len(articles)))
+    return feeds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    nsf = load_scraper(make_dictionary())
+    print(f"{'feed':<24} {'items':>5} {'max':>4} {'bs4(ms)':>8} {'lxml(ms)':>9}")
+    for name, body, count in archived_feeds():
+        for max_items in (3, 10, count):
+            expected = [{**a, "url": nsf.canonicalize_url(a["url"])}
+                        for a in parse_rss_bs4(body.decode("utf-8"), max_items)]
+            assert nsf.parse_rss(body, max_items) == expected
+            bs4_ms = timeit.timeit(lambda: parse_rss_bs4(body.decode("utf-8"), max_items), number=args.repeat)
+            lxml_ms = timeit.timeit(lambda: nsf.parse_rss(body, max_items), number=args.repeat)
+            print(f"{name:<24} {count:>5} {max_items:>4} "
+                  f"{bs4_ms * 1000 / args.repeat:>8.2f} {lxml_ms * 1000 / args.repeat:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
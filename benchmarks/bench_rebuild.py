@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""rebuild_archive の所要時間をプロセス数ごとに計測する（日別JSONは合成）
+
+    python benchmarks/bench_rebuild.py [--days 365] [--articles 40]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from datetime import date, timedelta
+
+from bench_render import synthetic_articles
+from stubs import load_scraper, make_dictionary
+
+
+def write_days(n_days, n_articles):
+    os.makedirs("archive/data", exist_ok=True)
+    start = date(2025, 1, 1)
+    for i in range(n_days):
+        day = (start + timedelta(days=i)).isoformat()
+        with open(f"archive/data/news_{day}.json", "w", encoding="utf-8") as f:
+            json.dump({"date": day, "articles": synthetic_articles(n_articles)}, f, ensure_ascii=False)
+
+
+def timed(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--articles", type=int, default=40)
+    args = parser.parse_args()
+
+    nsf = load_scraper(make_dictionary())
+    write_days(args.days, args.articles)
+    print(f"{args.days}日 x {args.articles}件")
+    print(f"{'workers':>8} {'full(s)':>8} {'unchanged(s)':>13}")
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        full = timed(nsf.rebuild_archive, workers=workers, force=True)
+        unchanged = timed(nsf.rebuild_archive, workers=workers)
+        print(f"{workers:>8} {full:>8.2f} {unchanged:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
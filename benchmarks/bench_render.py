@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""build_page1 の描画時間とピークメモリを記事数ごとに計測する
+
+    python benchmarks/bench_render.py
+"""
+import contextlib
+import io
+import time
+import tracemalloc
+
+from stubs import load_scraper, make_dictionary
+
+
+def synthetic_articles(n):
+    categories = ["ホロライブ", "にじさんじ", "個人VTuber", "その他"]
+    tags = ["新衣装", "コラボ", "炎上", "海外", "重大発表", "イベント"]
+    return [
+        {
+            "title": f"VTuberニュース {i}",
+            "url": f"https://example.com/articles/{i}",
+            "snippet": "配信・新衣装・コラボの話題。" * 12,
+            "date": "Sun, 07 Dec 2025 12:00:00 GMT",
+            "category": categories[i % len(categories)],
+            "tags": tags[i % 4:i % 4 + 2],
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    nsf = load_scraper(make_dictionary())
+    print(f"{'articles':>8} {'time(ms)':>9} {'peak(KB)':>9}")
+    for n in (100, 1000, 10000):
+        articles = synthetic_articles(n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracemalloc.start()
+            start = time.perf_counter()
+            nsf.build_page1(articles, "2025-12-07")
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"{n:>8} {elapsed * 1000:>9.1f} {peak / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""検索インデックスの1日ごとの追加・クエリ時間とシャードサイズを計測する
+
+合成した10万記事を --days 日に分けて1日ずつ update_search_index に渡し、1日あたりの
+時間と書き込んだファイル数を見る。クエリはブラウザ側と同じ手順（meta → 各セグメントの
+必要なシャード → docsチャンク）をPythonで再現して測る。
+
+    python benchmarks/bench_search.py [--articles 100000] [--days 365]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import statistics
+import time
+
+from datetime import date, timedelta
+
+from stubs import load_scraper, make_dictionary
+
+WORD_CHARS = "ホロライブにじさんじ配信新衣装コラボ卒業発表歌枠記念企画公式番組出演決定開催予定限定グッズ海外人気声優"
+
+
+def synthetic_articles(n, rng):
+    vocab = ["".join(rng.choices(WORD_CHARS, k=rng.randint(2, 4))) for _ in range(3000)]
+    articles = []
+    for i in range(n):
+        title = "".join(rng.choices(vocab, k=6))
+        snippet = "".join(rng.choices(vocab, k=25))
+        articles.append({"title": title, "snippet": snippet, "url": f"https://example.com/{i}"})
+    return articles
+
+
+def client_query(q, nsf):
+    """search.html のクエリ手順をPythonで再現"""
+    with open(os.path.join(nsf.SEARCH_DIR, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    lists = []
+    for token in nsf.search_tokens(q):
+        ids = set()
+        for segment in meta["segments"]:
+            path = nsf._shard_path(segment, nsf.search_shard(token, segment["shards"]))
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                deltas = json.load(f).get(token, [])
+            last = 0
+            for d in deltas:
+                last += d
+                ids.add(last)
+        lists.append(ids)
+    lists.sort(key=len)
+    hits = lists[0].intersection(*lists[1:]) if lists else set()
+    top = sorted(hits, reverse=True)[:50]
+    chunks = {}
+    for doc_id in top:
+        chunk_id = doc_id // meta["docs_per_chunk"]
+        if chunk_id not in chunks:
+            with open(os.path.join(nsf.SEARCH_DIR, "docs", f"{chunk_id}.json"), encoding="utf-8") as f:
+                chunks[chunk_id] = json.load(f)
+    return len(hits)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    nsf = load_scraper(make_dictionary())
+    articles = synthetic_articles(args.articles, rng)
+
+    # 1日ごとに書き込んだファイル数を数える
+    written = []
+    write_chunks = nsf.write_chunks
+
+    def counting_write_chunks(path, chunks, *rest, **kwargs):
+        written.append(path)
+        return write_chunks(path, chunks, *rest, **kwargs)
+
+    nsf.write_chunks = counting_write_chunks
+    per_day = args.articles // args.days
+    timings, files = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.days):
+            day = (date(2025, 1, 1) + timedelta(days=i)).isoformat()
+            del written[:]
+            start = time.perf_counter()
+            nsf.update_search_index(articles[i * per_day:(i + 1) * per_day], day)
+            timings.append(time.perf_counter() - start)
+            files.append(len(written))
+    nsf.write_chunks = write_chunks
+    print(f"{args.days} days x {per_day} articles: total {sum(timings):.1f}s, "
+          f"per day median {statistics.median(timings) * 1000:.0f} ms / max {max(timings) * 1000:.0f} ms, "
+          f"files written median {statistics.median(files):.0f} / max {max(files)}")
+
+    with open(os.path.join(nsf.SEARCH_DIR, "meta.json"), encoding="utf-8") as f:
+        segments = json.load(f)["segments"]
+    print(f"segments: {len(segments)}（月 {sum('month' in s for s in segments)} / 日 {sum('day' in s for s in segments)}）")
+    shard_sizes = [os.path.getsize(p) for p in glob.glob(os.path.join(nsf.SEARCH_DIR, "segments", "*", "*.json"))]
+    doc_sizes = [os.path.getsize(p) for p in glob.glob(os.path.join(nsf.SEARCH_DIR, "docs", "*.json"))]
+    print(f"shards: {len(shard_sizes)} files, total {sum(shard_sizes) / 1e6:.1f} MB, "
+          f"median {statistics.median(shard_sizes) / 1e3:.0f} KB, max {max(shard_sizes) / 1e3:.0f} KB")
+    print(f"docs:   {len(doc_sizes)} files, median {statistics.median(doc_sizes) / 1e3:.0f} KB")
+
+    queries = [a["title"][i:i + l] for a in rng.sample(articles, 50) for i, l in ((0, 4), (3, 6))]
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        client_query(q, nsf)
+        timings.append(time.perf_counter() - start)
+    print(f"query: median {statistics.median(timings) * 1000:.1f} ms, "
+          f"p95 {sorted(timings)[int(len(timings) * 0.95)] * 1000:.1f} ms ({len(queries)} queries)")
+
+
+if __name__ == "__main__":
+    main()
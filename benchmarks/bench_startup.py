@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""起動コストの計測（-X importtime と辞書の冷/温ロード）
+
+import 時に読み込むモジュールの上位と、dictionary.json を JSON から読んで
+KeywordMatcher を組む場合と .cache/dictionary.pickle から復元する場合を比べる。
+
+    python benchmarks/bench_startup.py [--keywords 1000 10000] [--repeat 20] [--top 10]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from bench_match import synthetic_keywords
+from stubs import REPO_ROOT, load_scraper, make_dictionary
+
+
+def importtime(workdir, top):
+    """python -X importtime -c "import news_scraper_full" の結果（自己時間の大きい順）"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import news_scraper_full"],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    total = next(c for _, c, name in rows if name == "news_scraper_full")
+    return total, sorted(rows, reverse=True)[:top]
+
+
+def time_load(nsf, repeat, warm):
+    """Config.load の平均時間（ms）。warm=False なら毎回 pickle を消す"""
+    nsf.CONFIG.load()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        if not warm and os.path.exists(nsf.DICTIONARY_CACHE):
+            os.remove(nsf.DICTIONARY_CACHE)
+        nsf.Config(nsf.DICTIONARY_JSON).load()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keywords", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    nsf = load_scraper(make_dictionary())
+    total, rows = importtime(os.getcwd(), args.top)
+    print(f"import news_scraper_full: {total / 1000:.1f} ms（累積）")
+    print(f"{'self(ms)':>9} {'cum(ms)':>8}  module")
+    for self_us, cumulative_us, name in rows:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>8.1f}  {name}")
+
+    print()
+    print(f"{'keywords':>8} {'cold(ms)':>9} {'warm(ms)':>9}")
+    rng = random.Random(0)
+    for n in args.keywords:
+        dictionary = make_dictionary()
+        dictionary["keywords"] = synthetic_keywords(n, rng)
+        with open(nsf.DICTIONARY_JSON, "w", encoding="utf-8") as f:
+            json.dump(dictionary, f, ensure_ascii=False)
+        cold = time_load(nsf, args.repeat, warm=False)
+        warm = time_load(nsf, args.repeat, warm=True)
+        print(f"{n:>8} {cold:>9.2f} {warm:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""ベンチマーク用のローカルスタブサーバーと共通ヘルパー"""
+import glob
+import importlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_rss(n_items, tag="stub"):
+    """n件のitemを持つBing風RSSを生成"""
+    items = []
+    for i in range(n_items):
+        items.append(
+            f"<item><title>{tag} VTuberニュース {i}</title>"
+            f"<link>https://example.com/{tag}/{i}</link>"
+            f"<description>{tag} の記事 {i} ホロライブ コラボ 新衣装 お披露目</description>"
+            f"<pubDate>Sun, 07 Dec 2025 12:00:00 GMT</pubDate></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+        f"<title>{tag}</title>{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+def archived_articles():
+    """archive/data/news_*.json の記事をすべて読む"""
+    articles = []
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, "archive", "data", "news_*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            articles.extend(json.load(f)["articles"])
+    return articles
+
+
+def synthetic_feed(n_items, seed=0):
+    """クエリごとに別記事を返すフィード（本文はアーカイブの文字分布から作る）"""
+    chars = [ch for a in archived_articles() for ch in a["title"] + a["snippet"] if not ch.isspace()]
+    words = ["ホロライブ", "にじさんじ", "新衣装", "コラボ", "イベント", "海外", "卒業", ""]
+
+    def feed(query):
+        rng = random.Random(f"{seed}:{query}")
+        items = []
+        for i in range(n_items):
+            title = rng.choice(words) + "".join(rng.choices(chars, k=30))
+            snippet = "".join(rng.choices(chars, k=120)) + rng.choice(words)
+            items.append(
+                f"<item><title>{escape(title)}</title>"
+                f"<link>https://example.com/{escape(query)}/{i}</link>"
+                f"<description>{escape(snippet)}</description>"
+                f"<pubDate>Sun, 07 Dec 2025 12:00:00 GMT</pubDate></item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f"<title>{escape(query)}</title>{''.join(items)}</channel></rss>"
+        ).encode("utf-8")
+    return feed
+
+
+def recorded_feed(paths):
+    """保存済みのRSSファイルをクエリごとに順番に割り当てて返すフィード"""
+    bodies = []
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            bodies.append(f.read())
+    assigned = {}
+
+    def feed(query):
+        if query not in assigned:
+            assigned[query] = bodies[len(assigned) % len(bodies)]
+        return assigned[query]
+    return feed
+
+
+class _RSSHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = self.server.body_for(parse_qs(urlsplit(self.path).query).get("q", [""])[0])
+        etag = '"%08x"' % (hash(body) & 0xFFFFFFFF)
+        if self.server.etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+        if self.server.etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_rss_server(latency=0.05, n_items=20, etag=False, feed=None):
+    """遅延付きのRSSスタブを起動し (server, URLテンプレート) を返す
+
+    feed はクエリ文字列から本文(bytes)を返す関数。省略時は全クエリに同じ本文を返す。
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RSSHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.etag = etag
+    bodies = {}
+    lock = threading.Lock()
+    body = make_rss(n_items)
+
+    def body_for(query):
+        if feed is None:
+            return body
+        with lock:
+            if query not in bodies:
+                bodies[query] = feed(query)
+            return bodies[query]
+    server.body_for = body_for
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}/news/search?q={{query}}&format=rss"
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        numbered = [line for line in body["prompt"].splitlines() if re.fullmatch(r"\[\d+\]", line)]
+        if numbered:
+            # 記事ごとの要約プロンプトには [n] 形式で1行ずつ返す
+            text = "\n".join(f"{n} 要約（スタブ）" for n in numbered)
+        else:
+            text = f"分析結果（{len(body['prompt'])}文字のプロンプト）"
+        time.sleep(self.server.latency)
+        if body.get("stream", True):
+            # /api/generate のストリーミング形式（1行1JSON）
+            chunks = [text[i:i + 4] for i in range(0, len(text), 4)]
+            lines = [json.dumps({"response": c, "done": False}, ensure_ascii=False) for c in chunks]
+            lines.append(json.dumps({"response": "", "done": True}))
+            payload = ("\n".join(lines) + "\n").encode("utf-8")
+        else:
+            payload = json.dumps({"response": text, "done": True}, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_ollama_server(latency=0.5):
+    """偽の /api/generate を起動し (server, URL) を返す。受けたリクエストは server.requests"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}/api/generate"
+
+
+def make_dictionary(n_queries=0, settings=None):
+    """ベンチマーク用の最小 dictionary.json の中身"""
+    return {
+        "queries": [
+            {"search_query": f"vtuber{i}", "max_items": 10, "enabled": True}
+            for i in range(n_queries)
+        ],
+        "keywords": [
+            {"keyword": "ホロライブ", "category": "ホロライブ"},
+            {"keyword": "にじさんじ", "category": "にじさんじ"},
+        ],
+        "kinji_comments": {
+            "ホロライブ": [{"comment_text": f"ホロ {i}"} for i in range(5)],
+            "その他": [{"comment_text": f"その他 {i}"} for i in range(5)],
+        },
+        "settings": settings or {},
+    }
+
+
+def load_scraper(dictionary):
+    """一時ディレクトリに dictionary.json を置いて news_scraper_full を読み込む"""
+    workdir = tempfile.mkdtemp(prefix="vtuber-bench-")
+    with open(os.path.join(workdir, "dictionary.json"), "w", encoding="utf-8") as f:
+        json.dump(dictionary, f, ensure_ascii=False)
+    os.chdir(workdir)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    sys.modules.pop("news_scraper_full", None)
+    return importlib.import_module("news_scraper_full")
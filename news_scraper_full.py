@@ -1,10 +1,33 @@
 # -*- coding: utf-8 -*-
 import os
+import re
 import json
-import requests
-from datetime import datetime
-from bs4 import BeautifulSoup
+import time
+import struct
+import unicodedata
+import glob
+import gzip
+import bisect
+import argparse
+import hashlib
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
 import random
+import pickle
+from io import BytesIO, StringIO
+
+try:
+    import fcntl  # reflink用（Linuxのみ）
+except ImportError:
+    fcntl = None
+_FICLONE = 0x40049409  # linux/fs.h
 
 # ===========================================================
 # 設定
@@ -12,6 +35,8 @@ import random
 DICTIONARY_JSON = "dictionary.json"
 USE_OLLAMA = False  # Ollamaを使う場合はTrueに変更
 OLLAMA_MODEL = "llama3.2"
+OLLAMA_URL = "http://localhost:11434/api/generate"
+BING_RSS_URL = "https://www.bing.com/news/search?q={query}&format=rss"
 
 # タグ抽出ルール（重要）
 TAG_RULES = [
@@ -23,39 +48,408 @@ TAG_RULES = [
     ("イベント", ["イベント", "ライブ", "フェス"]),
 ]
 
+ARCHIVE_MANIFEST = "archive/manifest.json"
+SEARCH_DIR = "archive/search"
+SEARCH_DOCS_PER_CHUNK = 1000
+SEARCH_POSTINGS_PER_SHARD = 5000  # セグメントを分割する目安（1シャードあたりの記事IDの数）
+DICTIONARY_CACHE = os.path.join(".cache", "dictionary.pickle")
+
 # ===========================================================
-# 辞書ロード
+# 辞書ロード（初回アクセス時）
 # ===========================================================
-try:
-    with open(DICTIONARY_JSON, "r", encoding="utf-8") as f:
-        DICT = json.load(f)
-except FileNotFoundError:
-    print(f"❌ {DICTIONARY_JSON} が見つかりません")
-    exit(1)
+class Config:
+    """dictionary.json の内容と、そこから決まる設定値（初回アクセス時に読み込む）"""
+    
+    # settings のキー → 既定値（値はこの型に変換する）
+    DEFAULTS = {
+        "fetch_workers": 8,  # 同時取得数
+        "per_host_limit": 4,  # 1ホストあたりの同時接続数
+        "cache_dir": ".cache",
+        "near_dup_threshold": 0.7,  # 1以上で近似重複除去を無効化
+        "near_dup_ngram": 3,
+        "skip_seen_articles": True,  # 前日までに掲載済みの記事を除外
+        "kinji_seed": 0,  # 金次コメントの並びを決める seed
+        "refresh_interval": 900,  # 常駐モードでのクエリ再取得間隔（秒、クエリの "interval" で上書き）
+        "seen_max_age_days": 30,
+        "article_db": "archive/data/news.sqlite3",
+        "search_shards": 256,  # 1セグメントの最大分割数（bigramの2文字で振り分け）
+        "search_day_segments": 7,  # これを超えたら今月の日セグメントも月セグメントにまとめる
+        "ollama_cache_max_age_days": 30,
+        "ollama_cache_max_entries": 500,
+        "ollama_deep_count": 2,  # 深掘りする上位記事数（2件ずつ1リクエスト）
+        "ollama_workers": 2,  # Ollamaへの同時リクエスト数
+        "ollama_summaries": False,  # 記事ごとのAI要約
+        "ollama_summary_batch": 5,  # 1リクエストにまとめる記事数
+        "note_url": "",
+        "line_url": "",
+        "x_url": "",
+        "minify_html": True,  # 各行のインデントと空行を落とす
+        "precompress": True,  # HTML/CSS/JS/JSON の隣に .gz（エンコーダがあれば .br）を置く
+        "metrics_max_bytes": 10 * 1024 * 1024,  # metrics.jsonl がこれを超えたら .1 に回して新しく始める（0で無効）
+        "metrics_prom": "",  # Prometheus textfile collector 用の出力先（空なら書かない）
+        "profile_stages": [],  # cProfile を取るステージ名（"all" で全部）
+        "trace_memory_stages": [],  # tracemalloc でメモリを見るステージ名
+    }
+    
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self._matcher = None
+        self._stat = None
+    
+    def load(self):
+        """辞書を読み込む（mtime・内容ハッシュが同じならpickleキャッシュから復元）"""
+        st = os.stat(self.path)
+        self._stat = (st.st_mtime_ns, st.st_size)
+        rules = self._matcher_digest()
+        try:
+            with open(DICTIONARY_CACHE, "rb") as f:
+                cached = pickle.load(f)
+            if cached["path"] != os.path.abspath(self.path) or cached["rules"] != rules:
+                cached = None
+        except Exception:
+            cached = None
+        
+        if cached and (cached["mtime_ns"], cached["size"]) == (st.st_mtime_ns, st.st_size):
+            self._restore(cached)
+            return
+        
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached and cached["sha256"] == digest:
+            self._restore(cached)  # touch されただけ
+        else:
+            self._data = json.loads(raw.decode("utf-8"))
+            self._matcher = KeywordMatcher(self.keywords, TAG_RULES)
+        
+        cache = {
+            "path": os.path.abspath(self.path), "rules": rules, "sha256": digest,
+            "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+            "data": self._data, "matcher": vars(self._matcher),
+        }
+        try:
+            os.makedirs(os.path.dirname(DICTIONARY_CACHE), exist_ok=True)
+            with open(DICTIONARY_CACHE + ".tmp", "wb") as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(DICTIONARY_CACHE + ".tmp", DICTIONARY_CACHE)
+        except OSError as e:
+            print(f"⚠ 辞書キャッシュを書き込めません: {e}")
+    
+    @staticmethod
+    def _matcher_digest():
+        """TAG_RULES と KeywordMatcher のバイトコードのハッシュ（どちらかが変われば pickle を使わない）"""
+        h = hashlib.sha256(repr(TAG_RULES).encode("utf-8"))
+        
+        def add(code):
+            h.update(code.co_code)
+            h.update(repr((code.co_names, code.co_varnames)).encode("utf-8"))
+            for const in code.co_consts:
+                if hasattr(const, "co_code"):
+                    add(const)
+                else:
+                    h.update(repr(const).encode("utf-8"))
+        
+        for name, value in sorted(vars(KeywordMatcher).items()):
+            code = getattr(getattr(value, "__func__", value), "__code__", None)
+            if code is not None:
+                h.update(name.encode("utf-8"))
+                add(code)
+        return h.hexdigest()
+    
+    def _restore(self, cached):
+        self._data = cached["data"]
+        self._matcher = KeywordMatcher.__new__(KeywordMatcher)
+        vars(self._matcher).update(cached["matcher"])
+    
+    def reload(self):
+        """次のアクセスで辞書を読み直す"""
+        self._data = None
+        self._matcher = None
+    
+    def is_stale(self):
+        """読み込み後に dictionary.json が更新されたか"""
+        if self._stat is None:
+            return False
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (st.st_mtime_ns, st.st_size) != self._stat
+    
+    @property
+    def data(self):
+        if self._data is None:
+            self.load()
+        return self._data
+    
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            self.load()
+        return self._matcher
+    
+    @property
+    def queries(self):
+        return self.data.get("queries", [])
+    
+    @property
+    def keywords(self):
+        return self.data.get("keywords", [])
+    
+    @property
+    def kinji_comments(self):
+        return self.data.get("kinji_comments", {})
+    
+    @property
+    def settings(self):
+        return self.data.get("settings", {})
+    
+    @property
+    def http_cache_file(self):
+        return os.path.join(self.cache_dir, "http_cache.json")
+    
+    @property
+    def seen_db(self):
+        return os.path.join(self.cache_dir, "seen.sqlite3")
+    
+    @property
+    def ollama_cache_db(self):
+        return os.path.join(self.cache_dir, "ollama_cache.sqlite3")
+    
+    @property
+    def metrics_file(self):
+        return self.settings.get("metrics_file") or os.path.join(self.cache_dir, "metrics.jsonl")
+    
+    def __getattr__(self, name):
+        if name not in Config.DEFAULTS:
+            raise AttributeError(name)
+        default = Config.DEFAULTS[name]
+        return type(default)(self.settings.get(name, default))
 
-QUERIES = DICT.get("queries", [])
-KEYWORDS = DICT.get("keywords", [])
-KINJI_COMMENTS = DICT.get("kinji_comments", {})
-SETTINGS = DICT.get("settings", {})
+CONFIG = Config(DICTIONARY_JSON)
 
-NOTE_URL = SETTINGS.get("note_url", "")
-LINE_URL = SETTINGS.get("line_url", "")
-X_URL = SETTINGS.get("x_url", "")
+# ===========================================================
+# 計測（ステージごとの時間・件数・キャッシュ）
+# ===========================================================
+PROFILE_STAGES = set()  # コマンドラインの --profile で追加
+TRACE_MEMORY_STAGES = set()  # コマンドラインの --trace-memory で追加
+_COUNTERS = ("items", "bytes", "cache_hits", "cache_misses", "failures")
+
+_metrics = []
+_metrics_lock = threading.Lock()
+_stage_local = threading.local()
+
+def _stage_enabled(name, cli, setting):
+    names = cli | set(CONFIG.settings.get(setting, []))
+    return name in names or "all" in names
+
+@contextmanager
+def stage(name, **labels):
+    """with 内の処理を1ステージとして計測する（記録は write_metrics で書き出す）"""
+    record = {"stage": name, **labels, "started": time.time(), "seconds": 0.0}
+    record.update(dict.fromkeys(_COUNTERS, 0))
+    stack = _stage_local.__dict__.setdefault("stack", [])
+    stack.append(record)
+    
+    profiler = None
+    if _stage_enabled(name, PROFILE_STAGES, "profile_stages"):
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # 別スレッドで計測中
+            profiler = None
+    tracing = _stage_enabled(name, TRACE_MEMORY_STAGES, "trace_memory_stages")
+    if tracing:
+        import tracemalloc
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception:
+        record["failures"] += 1
+        raise
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        stack.pop()
+        if profiler:
+            profiler.disable()
+            path = os.path.join(CONFIG.cache_dir, "profile", f"{name}-{int(record['started'] * 1000)}.prof")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            profiler.dump_stats(path)
+            record["profile"] = path
+            print(f"  → プロファイル保存: {path}")
+        if tracing:
+            # 全スレッド分の確保が入る
+            record["mem_peak"] = tracemalloc.get_traced_memory()[1]
+            top = tracemalloc.take_snapshot().statistics("lineno")[:5]
+            record["mem_top"] = [f"{stat.traceback} {stat.size}B" for stat in top]
+            if started_tracing:
+                tracemalloc.stop()
+        with _metrics_lock:
+            _metrics.append(record)
+
+def count(key, n=1):
+    """実行中のステージ（このスレッドで一番内側）のカウンタを増やす"""
+    stack = getattr(_stage_local, "stack", None)
+    if stack:
+        stack[-1][key] += n
+
+def note(key, value):
+    """実行中のステージ（このスレッドで一番内側）の記録に値を残す"""
+    stack = getattr(_stage_local, "stack", None)
+    if stack:
+        stack[-1][key] = value
+
+def _prom_labels(record):
+    """ステージ名とラベル（query など文字列の項目）を Prometheus のラベル表記にする"""
+    labels = []
+    for key, value in sorted(record.items()):
+        if isinstance(value, str) and key != "profile":
+            value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+            labels.append(f'{key}="{value}"')
+    return "{" + ",".join(labels) + "}"
+
+def write_metrics():
+    """記録したステージをJSON Linesに追記し、設定があればPrometheus形式でも書き出す
+    
+    JSON Lines は metrics_max_bytes を超えたら1世代だけ残して回す（常駐モードでも増え続けない）
+    """
+    with _metrics_lock:
+        records = list(_metrics)
+        _metrics.clear()
+    if not records:
+        return
+    
+    run = datetime.fromtimestamp(min(r["started"] for r in records)).isoformat(timespec="seconds")
+    path = CONFIG.metrics_file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        if CONFIG.metrics_max_bytes and os.path.getsize(path) >= CONFIG.metrics_max_bytes:
+            os.replace(path, path + ".1")
+    except FileNotFoundError:
+        pass
+    with open(path, "a", encoding="utf-8") as f:
+        for r in sorted(records, key=lambda r: r["started"]):
+            f.write(json.dumps({"run": run, **r}, ensure_ascii=False) + "\n")
+    
+    if CONFIG.metrics_prom:
+        totals = {}
+        for r in records:
+            row = totals.setdefault(_prom_labels(r), dict.fromkeys(("seconds", *_COUNTERS), 0))
+            for key in row:
+                row[key] += r[key]
+        lines = []
+        for key in ("seconds", *_COUNTERS):
+            metric = f"vtuber_news_stage_{key}"
+            lines.append(f"# TYPE {metric} gauge\n")
+            lines += [f"{metric}{labels} {row[key]:g}\n" for labels, row in sorted(totals.items())]
+        lines.append("# TYPE vtuber_news_last_run_timestamp_seconds gauge\n")
+        lines.append(f"vtuber_news_last_run_timestamp_seconds {time.time():.0f}\n")
+        write_chunks(CONFIG.metrics_prom, lines)
+    
+    slowest = max(records, key=lambda r: r["seconds"])
+    print(f"  → 計測: {path}（{len(records)}ステージ、最長 {slowest['stage']} {slowest['seconds']:.2f}s）")
+
+# ===========================================================
+# キーワード照合（Aho-Corasick）
+# ===========================================================
+class KeywordMatcher:
+    """カテゴリ用キーワードとタグ用キーワードを1回の走査でまとめて照合する"""
+    
+    def __init__(self, keywords, tag_rules):
+        self.categories = [row.get("category", "") for row in keywords]
+        self.labels = [label for label, _ in tag_rules]
+        self.no_row = len(keywords)  # 「該当なし」を表す行番号
+        self.always_mask = 0  # 空キーワードは常にヒット（従来の `"" in text` と同じ）
+        
+        self.goto = [{}]
+        self.rows = [self.no_row]
+        self.masks = [0]
+        
+        for i, row in enumerate(keywords):
+            keyword = str(row.get("keyword", "")).lower()
+            if keyword:
+                state = self._add(keyword)
+                self.rows[state] = min(self.rows[state], i)
+        
+        for j, (_, words) in enumerate(tag_rules):
+            for keyword in words:
+                keyword = keyword.lower()
+                if keyword:
+                    self.masks[self._add(keyword)] |= 1 << j
+                else:
+                    self.always_mask |= 1 << j
+        
+        self._link()
+    
+    def _add(self, pattern):
+        """トライにパターンを追加し、終端の状態番号を返す"""
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.rows.append(self.no_row)
+                self.masks.append(0)
+            state = nxt
+        return state
+    
+    def _link(self):
+        """失敗リンクを張り、出力（最小行番号・タグビット）を伝播させる"""
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                fallback = self.goto[f].get(ch, 0)
+                self.fail[nxt] = fallback if fallback != nxt else 0
+                self.rows[nxt] = min(self.rows[nxt], self.rows[self.fail[nxt]])
+                self.masks[nxt] |= self.masks[self.fail[nxt]]
+                queue.append(nxt)
+    
+    def scan(self, text):
+        """text を1回走査し (最初にヒットしたKEYWORDS行番号, タグのビットマスク) を返す"""
+        goto, fail, rows, masks = self.goto, self.fail, self.rows, self.masks
+        state = 0
+        best = self.no_row
+        mask = self.always_mask
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if rows[state] < best:
+                best = rows[state]
+            mask |= masks[state]
+        return best, mask
+    
+    def match(self, text, default_category):
+        """カテゴリとタグ（最大3個）を返す"""
+        best, mask = self.scan(text)
+        category = self.categories[best] if best < self.no_row else default_category
+        tags = [label for j, label in enumerate(self.labels) if mask >> j & 1]
+        return category, list(dict.fromkeys(tags))[:3]
+
+def match_article(title, snippet):
+    """カテゴリとタグを1回の走査で求める"""
+    text = (title + " " + snippet).lower()
+    return CONFIG.matcher.match(text, CONFIG.settings.get("default_category", "その他"))
 
 # ===========================================================
 # カテゴリ分類
 # ===========================================================
 def classify_by_keyword(title, snippet):
     """辞書ベースのカテゴリ分類"""
-    text = (title + " " + snippet).lower()
-    
-    for row in KEYWORDS:
-        keyword = str(row.get("keyword", "")).lower()
-        category = row.get("category", "")
-        if keyword and keyword in text:
-            return category
-    
-    return SETTINGS.get("default_category", "その他")
+    return match_article(title, snippet)[0]
 
 def category_to_class(category):
     """カテゴリ名をCSSクラス名に変換"""
@@ -74,123 +468,598 @@ def category_to_class(category):
 # ===========================================================
 def extract_tags(title, snippet):
     """記事からタグを抽出（最大3個）"""
-    text = (title + " " + snippet).lower()
-    tags = []
-    
-    for label, keywords in TAG_RULES:
-        for keyword in keywords:
-            if keyword.lower() in text:
-                tags.append(label)
-                break  # 同じタグは1回だけ
-    
-    # 重複を除去して最大3個まで
-    return list(dict.fromkeys(tags))[:3]
+    return match_article(title, snippet)[1]
 
 # ===========================================================
 # 金次コメント
 # ===========================================================
-_used_comments = {}
+class KinjiDeck:
+    """カテゴリごとにシャッフルした山札から順にコメントを配る
+    
+    位置はカテゴリごとの通算配布枚数。山札は (seed, カテゴリ, 周回) から決まるので、
+    seed と配り始めの位置が同じなら同じ並びになる。1枚あたりO(1)（1周ごとに1回シャッフル）。
+    """
+    
+    def __init__(self, kinji_comments, seed=0, start=None):
+        self.comments = {
+            category: [c.get("comment_text", "") for c in rows]
+            for category, rows in kinji_comments.items()
+        }
+        self.seed = seed
+        self.start = dict(start or {})
+        self.positions = dict(self.start)
+        self._decks = {}  # カテゴリ -> (周回, 山札)
+    
+    def _shuffled(self, category, cycle):
+        deck = list(self.comments[category])
+        random.Random(f"{self.seed}:{category}:{cycle}").shuffle(deck)
+        return deck
+    
+    def _deck(self, category, cycle):
+        cached = self._decks.get(category)
+        if cached is None or cached[0] != cycle:
+            deck = self._shuffled(category, cycle)
+            # 周回の継ぎ目で同じコメントが続かないようにする（入れ替えるのは先頭2枚だけなので末尾は元のまま）
+            if cycle and len(deck) > 2:
+                previous_last = cached[1][-1] if cached and cached[0] == cycle - 1 else self._shuffled(category, cycle - 1)[-1]
+                if deck[0] == previous_last:
+                    deck[0], deck[1] = deck[1], deck[0]
+            cached = self._decks[category] = (cycle, deck)
+        return cached[1]
+    
+    def draw(self, category):
+        if category not in self.comments:
+            category = "その他"
+        comments = self.comments.get(category)
+        if not comments:
+            return ""
+        n = self.positions.get(category, 0)
+        self.positions[category] = n + 1
+        cycle, i = divmod(n, len(comments))
+        return self._deck(category, cycle)[i]
 
-def pick_unique_comment(category):
-    """カテゴリ別にユニークな金次コメントを選択"""
-    if category not in KINJI_COMMENTS:
-        category = "その他"
+_kinji_deck = None
+
+def _kinji_state_path():
+    return os.path.join(CONFIG.cache_dir, "kinji_state.json")
+
+def start_kinji_rotation(date_str, historical=False):
+    """その日の配り始めの位置で山札を用意する
     
-    comments = [c.get("comment_text", "") for c in KINJI_COMMENTS.get(category, [])]
+    前回の日付と同じ日なら前回と同じ位置から（再生成しても同じコメント）、後の日なら前回の続きから。
+    historical=True（過去分の再生成）とそれより前の日は状態を使わず、日付を混ぜた seed で配る。
+    """
+    global _kinji_deck
+    if historical:
+        _kinji_deck = KinjiDeck(CONFIG.kinji_comments, f"{CONFIG.kinji_seed}:{date_str}")
+        return _kinji_deck
+    state = _load_json(_kinji_state_path(), {})
+    if state.get("seed") != CONFIG.kinji_seed:
+        state = {}
     
-    if not comments:
-        return ""
+    day = state.get("day", "")
+    if day == date_str:
+        _kinji_deck = KinjiDeck(CONFIG.kinji_comments, CONFIG.kinji_seed, state.get("start"))
+    elif day < date_str:
+        _kinji_deck = KinjiDeck(CONFIG.kinji_comments, CONFIG.kinji_seed, state.get("end"))
+    else:
+        _kinji_deck = KinjiDeck(CONFIG.kinji_comments, f"{CONFIG.kinji_seed}:{date_str}")
+    return _kinji_deck
+
+def finish_kinji_rotation(date_str):
+    """配り終えた位置を保存（過去分の再生成では保存しない）"""
+    state = _load_json(_kinji_state_path(), {})
+    if state.get("seed") == CONFIG.kinji_seed and state.get("day", "") > date_str:
+        return
+    _write_json(_kinji_state_path(), {
+        "seed": CONFIG.kinji_seed,
+        "day": date_str,
+        "start": _kinji_deck.start,
+        "end": _kinji_deck.positions,
+    })
+
+def pick_unique_comment(category):
+    """カテゴリ別の山札から次の金次コメントを選択（1周するまで重複しない）"""
+    global _kinji_deck
+    if _kinji_deck is None:
+        _kinji_deck = KinjiDeck(CONFIG.kinji_comments, CONFIG.kinji_seed)
+    return _kinji_deck.draw(category)
+
+# ===========================================================
+# HTTPセッション
+# ===========================================================
+_session = None
+_session_lock = threading.Lock()
+_host_limits = {}
+
+def get_session():
+    """keep-aliveで使い回す共有セッションを返す"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests  # 取得するときだけ読み込む
+
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=CONFIG.per_host_limit,
+                pool_maxsize=max(CONFIG.fetch_workers, CONFIG.per_host_limit),
+            )
+            _session = requests.Session()
+            _session.headers.update({"User-Agent": "Mozilla/5.0"})
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def _host_limit(url):
+    """ホストごとの同時接続数を制限するセマフォ"""
+    host = urlsplit(url).netloc
+    with _session_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(CONFIG.per_host_limit)
+        return _host_limits[host]
+
+# ===========================================================
+# HTTPキャッシュ（条件付きGET）
+# ===========================================================
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+def load_http_cache():
+    """クエリURLをキーにしたレスポンスキャッシュを読み込む"""
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            try:
+                with open(CONFIG.http_cache_file, "r", encoding="utf-8") as f:
+                    _http_cache = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                _http_cache = {}
+        return _http_cache
+
+def save_http_cache():
+    """レスポンスキャッシュを書き出す（一時ファイル経由で置き換え）"""
+    if _http_cache is None:
+        return
+    os.makedirs(CONFIG.cache_dir, exist_ok=True)
+    tmp_path = CONFIG.http_cache_file + ".tmp"
+    with _http_cache_lock:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_http_cache, f, ensure_ascii=False)
+    os.replace(tmp_path, CONFIG.http_cache_file)
+
+def _cached_articles(entry):
+    """キャッシュ済み記事のコピーを返す（呼び出し側が書き換えるため）"""
+    return [dict(a) for a in entry["articles"]]
+
+# ===========================================================
+# URL正規化
+# ===========================================================
+_TRACKING_PARAMS = {
+    "ocid", "cvid", "ei", "fbclid", "gclid", "yclid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "spm",
+}
+
+def canonicalize_url(url):
+    """Bingのapiclickラッパーを外し、トラッキング引数を除いた正規URLを返す（解釈できないURLはそのまま）"""
+    try:
+        parts = urlsplit(url.strip())
+        
+        # bing.com/news/apiclick.aspx?...&url=<実URL>&c=... を展開
+        if parts.netloc.lower().endswith("bing.com") and parts.path.lower().endswith("/apiclick.aspx"):
+            target = dict(parse_qsl(parts.query)).get("url")
+            if target:
+                parts = urlsplit(target.strip())
+        port = parts.port
+    except ValueError:  # 不正なポート・IPv6表記など
+        return url
     
-    used = _used_comments.setdefault(category, set())
-    remain = [c for c in comments if c not in used]
+    if parts.scheme not in ("http", "https"):
+        return url
     
-    if not remain:
-        used.clear()
-        remain = comments[:]
+    host = (parts.hostname or "").lower()
+    if port and port != {"http": 80, "https": 443}[parts.scheme]:
+        host = f"{host}:{port}"
     
-    chosen = random.choice(remain)
-    used.add(chosen)
-    return chosen
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    )
+    path = re.sub(r"%[0-9a-f]{2}", lambda m: m.group(0).upper(), parts.path) or "/"
+    return urlunsplit(("https" if parts.scheme == "https" else "http", host, path, urlencode(query), ""))
 
 # ===========================================================
 # ニュース取得
 # ===========================================================
-def fetch_all_news():
-    """辞書のクエリに基づいてニュースを取得"""
-    print("▶ ニュース取得を開始...")
-    headers = {"User-Agent": "Mozilla/5.0"}
-    all_articles = []
+def _child_text(item, tag, default):
+    """item直下の要素テキスト（要素が無ければ default）"""
+    el = item.find(tag)
+    return "".join(el.itertext()) if el is not None else default
+
+def parse_rss(content, max_items):
+    """RSS本文（bytes）を逐次パースし、先頭 max_items 件で打ち切る"""
+    from lxml import etree
     
-    for q in QUERIES:
-        if not q.get("enabled", False):
-            continue
-        
-        search_query = q.get("search_query", "").strip()
-        max_items = int(q.get("max_items", 3))
+    articles = []
+    if max_items <= 0:
+        return articles
+    
+    for _, item in etree.iterparse(BytesIO(content), events=("end",), tag="item", recover=True):
+        date = _child_text(item, "pubDate", None)
+        articles.append({
+            "title": _child_text(item, "title", "タイトルなし"),
+            "url": canonicalize_url(_child_text(item, "link", "#")),
+            "snippet": _child_text(item, "description", "説明なし"),
+            "date": date if date is not None else datetime.now().strftime("%Y-%m-%d"),
+        })
+        if len(articles) >= max_items:
+            break
+        item.clear()
+    return articles
+
+def fetch_query(q):
+    """1クエリ分のRSSを取得して記事リストを返す"""
+    search_query = q.get("search_query", "").strip()
+    max_items = int(q.get("max_items", 3))
+    ttl = int(q.get("ttl", 0))  # 秒。この間は再取得しない
+    
+    url = BING_RSS_URL.format(query=search_query)
+    cache = load_http_cache()
+    entry = cache.get(url)
+    if entry and entry.get("max_items") != max_items:
+        entry = None
+    
+    if entry and ttl and time.time() - entry["fetched_at"] < ttl:
+        print(f"  → {search_query} はキャッシュ利用（TTL内）")
+        count("cache_hits")
+        return _cached_articles(entry)
+    
+    print(f"  → {search_query} を取得中...")
+    
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    
+    try:
+        with _host_limit(url):
+            r = get_session().get(url, headers=headers, timeout=10)
         
-        print(f"  → {search_query} を取得中...")
+        if r.status_code == 304 and entry:
+            entry["fetched_at"] = time.time()
+            count("cache_hits")
+            return _cached_articles(entry)
         
-        url = f"https://www.bing.com/news/search?q={search_query}&format=rss"
+        r.raise_for_status()
+        count("bytes", len(r.content))
+        body_hash = hashlib.sha256(r.content).hexdigest()
         
-        try:
-            r = requests.get(url, headers=headers, timeout=10)
-            r.raise_for_status()
-            soup = BeautifulSoup(r.text, "xml")
-            
-            items = soup.find_all("item")[:max_items]
-            
-            for item in items:
-                article = {
-                    "title": item.title.text if item.title else "タイトルなし",
-                    "url": item.link.text if item.link else "#",
-                    "snippet": item.description.text if item.description else "説明なし",
-                    "date": item.pubDate.text if item.pubDate else datetime.now().strftime("%Y-%m-%d"),
-                }
-                all_articles.append(article)
+        if entry and entry.get("body_hash") == body_hash:
+            # 本文が同一ならパースを省略
+            count("cache_hits")
+            articles = _cached_articles(entry)
+        else:
+            count("cache_misses")
+            with stage("parse", query=search_query) as m:
+                articles = parse_rss(r.content, max_items)
+                m["items"] = len(articles)
+                m["bytes"] = len(r.content)
         
-        except Exception as e:
-            print(f"⚠ {search_query} の取得失敗:", e)
-            continue
+        with _http_cache_lock:
+            cache[url] = {
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "body_hash": body_hash,
+                "fetched_at": time.time(),
+                "max_items": max_items,
+                "articles": [dict(a) for a in articles],
+            }
+        return articles
     
+    except Exception as e:
+        print(f"⚠ {search_query} の取得失敗:", e)
+        count("failures")
+        return []
+
+def _fetch_query_measured(q):
+    with stage("fetch_query", query=q.get("search_query", "").strip()) as m:
+        articles = fetch_query(q)
+        m["items"] = len(articles)
+        return articles
+
+def fetch_queries(queries):
+    """クエリごとの記事リストを並列に取得（queries と同じ順で返す）"""
+    if not queries:
+        return []
+    with stage("fetch") as m:
+        with ThreadPoolExecutor(max_workers=min(CONFIG.fetch_workers, len(queries))) as pool:
+            # map は投入順で結果を返すので辞書のクエリ順が保たれる
+            results = list(pool.map(_fetch_query_measured, queries))
+        save_http_cache()
+        m["items"] = sum(len(articles) for articles in results)
+    return results
+
+def fetch_all_news():
+    """辞書のクエリに基づいてニュースを取得（並列・クエリ順を維持）"""
+    print("▶ ニュース取得を開始...")
+    enabled = [q for q in CONFIG.queries if q.get("enabled", False)]
+    all_articles = [a for articles in fetch_queries(enabled) for a in articles]
     print(f"  → 合計 {len(all_articles)} 件取得")
     return all_articles
 
 # ===========================================================
 # 重複除去
 # ===========================================================
+_MINHASH_BANDS = 8
+_MINHASH_ROWS = 2
+_MINHASH_WORDS = struct.Struct(f"<{_MINHASH_BANDS * _MINHASH_ROWS}I")  # blake2b 64バイト = 32bit × 16
+_SITE_SUFFIX = re.compile(r"\s+[-|｜–—]\s*[^-|｜–—]{1,30}$")
+
+def normalize_for_dedupe(title, snippet):
+    """近似重複判定用にタイトル＋本文を正規化（サイト名・記号・空白を除去）"""
+    text = unicodedata.normalize("NFKC", _SITE_SUFFIX.sub("", title) + snippet).lower()
+    return re.sub(r"[\W_]+", "", text)
+
+def shingles(text, n=None):
+    """文字n-gramの集合"""
+    n = n or CONFIG.near_dup_ngram
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+def minhash_signature(shingle_set):
+    """MinHashシグネチャ（1回のblake2bから16個の独立ハッシュを取り、列ごとの最小値）"""
+    rows = [
+        _MINHASH_WORDS.unpack(hashlib.blake2b(s.encode("utf-8"), digest_size=_MINHASH_WORDS.size).digest())
+        for s in shingle_set
+    ]
+    return [min(col) for col in zip(*rows)]
+
+def drop_near_duplicates(articles, threshold=None):
+    """MinHash/LSHで候補を絞り、n-gramのJaccard係数が threshold 以上の後続記事を除く"""
+    if threshold is None:
+        threshold = CONFIG.near_dup_threshold
+    if threshold >= 1:
+        return list(articles)
+    
+    buckets = {}
+    kept = []
+    kept_shingles = []
+    for a in articles:
+        sh = shingles(normalize_for_dedupe(a["title"], a["snippet"]))
+        if not sh:
+            kept.append(a)
+            continue
+        
+        sig = minhash_signature(sh)
+        keys = [
+            (band, tuple(sig[band * _MINHASH_ROWS:(band + 1) * _MINHASH_ROWS]))
+            for band in range(_MINHASH_BANDS)
+        ]
+        candidates = {idx for key in keys for idx in buckets.get(key, ())}
+        if any(len(sh & kept_shingles[idx]) / len(sh | kept_shingles[idx]) >= threshold
+               for idx in candidates):
+            continue
+        
+        for key in keys:
+            buckets.setdefault(key, []).append(len(kept_shingles))
+        kept.append(a)
+        kept_shingles.append(sh)
+    return kept
+
 def dedupe_articles(articles):
-    """タイトルで重複を除去"""
-    seen = set()
+    """正規URL・タイトル完全一致と近似重複（MinHash）で重複を除去"""
+    seen_titles = set()
+    seen_urls = set()
     deduped = []
     for a in articles:
-        key = a["title"]
-        if key not in seen:
-            seen.add(key)
-            deduped.append(a)
-    print(f"  → {len(deduped)} 件に重複除去完了")
+        url = canonicalize_url(a["url"])
+        if a["title"] in seen_titles or url in seen_urls:
+            continue
+        seen_titles.add(a["title"])
+        if url != "#":
+            seen_urls.add(url)
+        deduped.append(a)
+    
+    exact = len(deduped)
+    deduped = drop_near_duplicates(deduped)
+    print(f"  → {len(deduped)} 件に重複除去完了（近似重複 {exact - len(deduped)} 件）")
     return deduped
 
 # ===========================================================
-# Ollama AI分析（Page2用）
+# 掲載済み記事インデックス（日をまたいだ重複除去）
 # ===========================================================
-def analyze_with_ollama_deep(articles):
-    """TOP2記事をOllamaで深掘り分析"""
-    if not USE_OLLAMA or len(articles) < 2:
-        return None
+def _fingerprint(kind, value):
+    """64bit整数の指紋（SQLiteのINTEGER PRIMARY KEYにそのまま載る）"""
+    digest = hashlib.blake2b(f"{kind}:{value}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def article_fingerprints(a):
+    """正規URLとタイトルの指紋"""
+    fps = [_fingerprint("t", a["title"])]
+    url = canonicalize_url(a["url"])
+    if url != "#":
+        fps.append(_fingerprint("u", url))
+    return fps
+
+def open_seen_db():
+    """掲載済みインデックスを開く（古いエントリはここで削除）"""
+    os.makedirs(CONFIG.cache_dir, exist_ok=True)
+    conn = sqlite3.connect(CONFIG.seen_db)
+    conn.execute("CREATE TABLE IF NOT EXISTS seen (fp INTEGER PRIMARY KEY, day TEXT NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS seen_day ON seen (day)")
+    cutoff = datetime.fromtimestamp(time.time() - CONFIG.seen_max_age_days * 86400).strftime("%Y-%m-%d")
+    with conn:
+        conn.execute("DELETE FROM seen WHERE day < ?", (cutoff,))
+    return conn
+
+def filter_seen_articles(articles, date_str):
+    """前日までに掲載した記事を除く（同じ日の再実行では残す）"""
+    if not CONFIG.skip_seen_articles or not articles:
+        return articles
+    
+    fps = [article_fingerprints(a) for a in articles]
+    flat = list({fp for group in fps for fp in group})
+    earlier = set()
+    conn = open_seen_db()
+    try:
+        for i in range(0, len(flat), 500):
+            chunk = flat[i:i + 500]
+            rows = conn.execute(
+                f"SELECT fp FROM seen WHERE day < ? AND fp IN ({','.join('?' * len(chunk))})",
+                [date_str, *chunk],
+            )
+            earlier.update(fp for fp, in rows)
+    finally:
+        conn.close()
+    
+    fresh = [a for a, group in zip(articles, fps) if not earlier.intersection(group)]
+    print(f"  → 掲載済み {len(articles) - len(fresh)} 件をスキップ")
+    return fresh
+
+def mark_articles_seen(articles, date_str):
+    """掲載した記事を記録（初出の日付を保持）"""
+    if not CONFIG.skip_seen_articles or not articles:
+        return
+    conn = open_seen_db()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen (fp, day) VALUES (?, ?)",
+                ((fp, date_str) for a in articles for fp in article_fingerprints(a)),
+            )
+    finally:
+        conn.close()
+
+# ===========================================================
+# Ollama結果キャッシュ
+# ===========================================================
+def ollama_cache_key(prompt, model=None):
+    """プロンプトとモデル名のハッシュ"""
+    return hashlib.sha256(f"{model or OLLAMA_MODEL}\0{prompt}".encode("utf-8")).hexdigest()
+
+def open_ollama_cache():
+    """Ollama結果キャッシュを開く（期限切れ・上限超過分はここで削除）"""
+    os.makedirs(CONFIG.cache_dir, exist_ok=True)
+    conn = sqlite3.connect(CONFIG.ollama_cache_db)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS responses ("
+        " key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS summaries ("
+        " url TEXT NOT NULL, model TEXT NOT NULL, summary TEXT NOT NULL, created REAL NOT NULL,"
+        " PRIMARY KEY (url, model))"
+    )
+    with conn:
+        cutoff = time.time() - CONFIG.ollama_cache_max_age_days * 86400
+        conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+        conn.execute("DELETE FROM summaries WHERE created < ?", (cutoff,))
+        conn.execute(
+            "DELETE FROM responses WHERE key NOT IN"
+            " (SELECT key FROM responses ORDER BY used DESC LIMIT ?)",
+            (CONFIG.ollama_cache_max_entries,),
+        )
+    return conn
+
+_ollama_slots = {}  # ollama_workers -> BoundedSemaphore（深掘りと要約で共有）
+_ollama_slots_lock = threading.Lock()
+
+def ollama_slot():
+    """Ollamaへの同時リクエスト数を ollama_workers までに抑えるセマフォ"""
+    n = max(1, CONFIG.ollama_workers)
+    with _ollama_slots_lock:
+        if n not in _ollama_slots:
+            _ollama_slots[n] = threading.BoundedSemaphore(n)
+        return _ollama_slots[n]
+
+def ollama_generate(prompt, timeout=60, partial=True):
+    """Ollamaでストリーミング生成（同じプロンプト・モデルならキャッシュを返す）
     
-    top2 = articles[:2]
+    初回トークンまでの時間はステージの記録（first_token_seconds）に残す。
+    途中で切れた場合はそこまでの出力を返す（キャッシュはしない）。partial=False なら例外にする。
+    """
+    import requests
     
-    prompt = f"""以下のVTuberニュース2件について分析してください。
+    key = ollama_cache_key(prompt)
+    conn = open_ollama_cache()
+    try:
+        row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            with conn:
+                conn.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+            print("  → Ollama分析はキャッシュ利用")
+            count("cache_hits")
+            return row[0]
+        
+        count("cache_misses")
+        parts = []
+        first_token = None
+        done = False
+        try:
+            with ollama_slot():
+                start = time.perf_counter()  # 空き待ちは含めない
+                with requests.post(
+                    OLLAMA_URL,
+                    json={
+                        "model": OLLAMA_MODEL,
+                        "prompt": prompt,
+                        "stream": True
+                    },
+                    timeout=timeout,
+                    stream=True,
+                ) as r:
+                    r.raise_for_status()
+                    for line in r.iter_lines():
+                        if not line:
+                            continue
+                        data = json.loads(line)
+                        token = data.get("response", "")
+                        if token:
+                            if first_token is None:
+                                first_token = time.perf_counter() - start
+                                note("first_token_seconds", round(first_token, 6))
+                            parts.append(token)
+                        if data.get("done"):
+                            done = True
+                            break
+        except (requests.RequestException, ValueError) as e:
+            if not parts or not partial:
+                raise
+            print(f"⚠ Ollama出力が途中で終了（{len(parts)}片まで使用）: {e}")
+        if not done and not partial:
+            raise RuntimeError(f"Ollama出力が完了前に終了（{len(parts)}片）")
+        
+        response = "".join(parts)
+        count("items", len(parts))
+        count("bytes", len(response.encode("utf-8")))
+        if first_token is not None:
+            print(f"  → Ollama 初回トークン {first_token:.2f}s / 完了 {time.perf_counter() - start:.2f}s")
+        if response and done:
+            now = time.time()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                             (key, response, now, now))
+        return response
+    finally:
+        conn.close()
 
-【記事1】
-タイトル: {top2[0]['title']}
-内容: {top2[0]['snippet']}
+# ===========================================================
+# Ollama AI分析（Page2用）
+# ===========================================================
+def build_deep_prompt(group):
+    """深掘り分析のプロンプト（記事2件なら従来と同じ文面）"""
+    blocks = "".join(
+        f"""【記事{i}】
+タイトル: {a['title']}
+内容: {a['snippet']}
 
-【記事2】
-タイトル: {top2[1]['title']}
-内容: {top2[1]['snippet']}
+"""
+        for i, a in enumerate(group, 1)
+    )
+    return f"""以下のVTuberニュース{len(group)}件について分析してください。
 
-以下の形式で回答してください：
+{blocks}以下の形式で回答してください：
 
 ■ 要点3行
 ・
@@ -208,33 +1077,162 @@ def analyze_with_ollama_deep(articles):
 
 ■ X投稿案
 （140字以内で投稿できる文章）"""
+
+def _analyze_group(group):
+    with stage("ollama", kind="deep"):
+        try:
+            return ollama_generate(build_deep_prompt(group))
+        except Exception as e:
+            print(f"⚠ Ollama分析エラー: {e}")
+            count("failures")
+            return None
+
+def analyze_with_ollama_deep(articles):
+    """上位記事（既定はTOP2）をOllamaで深掘り分析。2件ずつ並列にリクエストする"""
+    if not USE_OLLAMA or len(articles) < 2:
+        return None
     
-    try:
-        print("  → Ollama分析中...")
-        r = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False
-            },
-            timeout=60
-        )
-        data = r.json()
-        return data.get("response", "")
-    except Exception as e:
-        print(f"⚠ Ollama分析エラー: {e}")
+    top = articles[:max(CONFIG.ollama_deep_count, 2)]
+    groups = [top[i:i + 2] for i in range(0, len(top), 2)]
+    
+    print("  → Ollama分析中...")
+    with ThreadPoolExecutor(max_workers=max(1, min(CONFIG.ollama_workers, len(groups)))) as pool:
+        results = list(pool.map(_analyze_group, groups))
+    
+    results = [r for r in results if r]
+    if not results:
         return None
+    return "\n\n".join(results)
+
+def start_ollama_analysis(articles):
+    """深掘り分析をバックグラウンドで開始し Future を返す（ページ生成と並行させる）"""
+    pool = ThreadPoolExecutor(max_workers=1)
+    future = pool.submit(analyze_with_ollama_deep, articles)
+    pool.shutdown(wait=False)
+    return future
 
 # ===========================================================
-# JSON保存
+# 記事ごとのAI要約
 # ===========================================================
-def save_to_json(articles, date_str):
-    """データをJSONで保存"""
-    archive_dir = "archive/data"
-    os.makedirs(archive_dir, exist_ok=True)
+_SUMMARY_LINE = re.compile(r"^\s*\[(\d+)\]\s*(.+)$", re.MULTILINE)
+
+def build_summary_prompt(batch):
+    """複数記事の要約を1回で頼むプロンプト"""
+    blocks = "".join(
+        f"""[{i}]
+タイトル: {a['title']}
+内容: {a['snippet']}
+
+"""
+        for i, a in enumerate(batch, 1)
+    )
+    return f"""以下のVTuberニュース{len(batch)}件を、それぞれ60字以内の日本語1文で要約してください。
+
+{blocks}回答は記事ごとに1行、次の形式だけで出力してください：
+[1] 要約
+[2] 要約"""
+
+def _summarize_batch(batch):
+    """1バッチ分を要約して {番号: 要約} を返す"""
+    with stage("ollama", kind="summary"):
+        try:
+            response = ollama_generate(build_summary_prompt(batch), partial=False)  # 途中までの要約は保存しない
+        except Exception as e:
+            print(f"⚠ Ollama要約エラー: {e}")
+            count("failures")
+            return {}
+    return {int(n): text.strip() for n, text in _SUMMARY_LINE.findall(response or "")}
+
+def summarize_articles(articles):
+    """記事ごとのAI要約を a["summary"] に付ける（保存済みの要約は再利用し、新着分だけ生成）"""
+    if not USE_OLLAMA or not CONFIG.ollama_summaries or not articles:
+        return
     
-    # カテゴリとタグの集計
+    urls = [canonicalize_url(a["url"]) for a in articles]
+    conn = open_ollama_cache()
+    try:
+        known = {}
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            rows = conn.execute(
+                f"SELECT url, summary FROM summaries WHERE model = ? AND url IN ({','.join('?' * len(chunk))})",
+                [OLLAMA_MODEL, *chunk],
+            )
+            known.update(rows)
+        
+        pending = [(a, url) for a, url in zip(articles, urls) if url not in known]
+        batches = [pending[i:i + CONFIG.ollama_summary_batch] for i in range(0, len(pending), CONFIG.ollama_summary_batch)]
+        print(f"  → AI要約: 再利用 {len(articles) - len(pending)} 件 / 新規 {len(pending)} 件")
+        count("cache_hits", len(articles) - len(pending))
+        count("cache_misses", len(pending))
+        
+        with ThreadPoolExecutor(max_workers=max(1, CONFIG.ollama_workers)) as pool:
+            results = list(pool.map(lambda b: _summarize_batch([a for a, _ in b]), batches))
+        
+        now = time.time()
+        with conn:
+            for batch, summaries in zip(batches, results):
+                for n, (a, url) in enumerate(batch, 1):
+                    if summaries.get(n):
+                        known[url] = summaries[n]
+                        conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                                     (url, OLLAMA_MODEL, summaries[n], now))
+    finally:
+        conn.close()
+    
+    for a, url in zip(articles, urls):
+        if url in known:
+            a["summary"] = known[url]
+
+# ===========================================================
+# 記事DB（SQLite）
+# ===========================================================
+def open_article_db():
+    """記事DBを開く（日付・カテゴリ・タグ・正規URLに索引）"""
+    os.makedirs(os.path.dirname(CONFIG.article_db) or ".", exist_ok=True)
+    conn = sqlite3.connect(CONFIG.article_db)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            url TEXT NOT NULL,
+            title TEXT NOT NULL,
+            snippet TEXT NOT NULL,
+            pub_date TEXT,
+            category TEXT,
+            summary TEXT,
+            UNIQUE (date, url, title)
+        );
+        CREATE TABLE IF NOT EXISTS article_tags (
+            article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+            tag TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (article_id, tag)
+        );
+        CREATE TABLE IF NOT EXISTS daily_counts (
+            day TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, kind, name)
+        );
+        CREATE TABLE IF NOT EXISTS period_counts (
+            period TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (period, kind, name)
+        );
+        CREATE INDEX IF NOT EXISTS articles_date ON articles (date);
+        CREATE INDEX IF NOT EXISTS articles_category ON articles (category, date);
+        CREATE INDEX IF NOT EXISTS articles_url ON articles (url);
+        CREATE INDEX IF NOT EXISTS article_tags_tag ON article_tags (tag, article_id);
+    """)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def count_categories_and_tags(articles):
+    """カテゴリとタグの件数"""
     categories = {}
     tags = {}
     
@@ -245,6 +1243,168 @@ def save_to_json(articles, date_str):
         for tag in a.get("tags", []):
             tags[tag] = tags.get(tag, 0) + 1
     
+    return categories, tags
+
+def _periods(date_str):
+    """日付が属する週（ISO週）と月"""
+    year, week, _ = datetime.strptime(date_str, "%Y-%m-%d").isocalendar()
+    return [f"{year}-W{week:02d}", date_str[:7]]
+
+def _update_counts(conn, articles, date_str):
+    """日次・週次・月次の件数を差分で更新（その日の記事数に比例する手間だけ）"""
+    periods = _periods(date_str)
+    old_rows = conn.execute(
+        "SELECT kind, name, count FROM daily_counts WHERE day = ?", (date_str,)
+    ).fetchall()
+    categories, tags = count_categories_and_tags(articles)
+    new_rows = [("category", k, v) for k, v in categories.items()] + [("tag", k, v) for k, v in tags.items()]
+    
+    deltas = {}
+    for kind, name, count in old_rows:
+        deltas[(kind, name)] = deltas.get((kind, name), 0) - count
+    for kind, name, count in new_rows:
+        deltas[(kind, name)] = deltas.get((kind, name), 0) + count
+    
+    conn.execute("DELETE FROM daily_counts WHERE day = ?", (date_str,))
+    conn.executemany("INSERT INTO daily_counts VALUES (?, ?, ?, ?)",
+                     [(date_str, kind, name, count) for kind, name, count in new_rows])
+    for period in periods:
+        conn.executemany(
+            "INSERT INTO period_counts VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (period, kind, name) DO UPDATE SET count = count + excluded.count",
+            [(period, kind, name, delta) for (kind, name), delta in deltas.items() if delta],
+        )
+        conn.execute("DELETE FROM period_counts WHERE period = ? AND count <= 0", (period,))
+
+def _store_day(conn, articles, date_str):
+    """1日分を置き換える（呼び出し側のトランザクション内で使う）"""
+    _update_counts(conn, articles, date_str)
+    conn.execute("DELETE FROM articles WHERE date = ?", (date_str,))
+    for a in articles:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO articles (date, url, title, snippet, pub_date, category, summary)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (date_str, canonicalize_url(a["url"]), a["title"], a["snippet"],
+             a.get("date"), a.get("category"), a.get("summary")),
+        )
+        if cur.rowcount:
+            conn.executemany(
+                "INSERT OR IGNORE INTO article_tags (article_id, tag, position) VALUES (?, ?, ?)",
+                [(cur.lastrowid, tag, i) for i, tag in enumerate(a.get("tags", []))],
+            )
+
+def store_articles(articles, date_str):
+    """その日の記事を1トランザクションで記事DBに書き込む"""
+    conn = open_article_db()
+    try:
+        with conn:
+            _store_day(conn, articles, date_str)
+    finally:
+        conn.close()
+    print(f"✓ 記事DB保存: {CONFIG.article_db}（{len(articles)}件）")
+
+def query_articles(category=None, tag=None, since=None, until=None):
+    """記事DBを日付範囲・カテゴリ・タグで検索（例：今月の炎上記事）"""
+    sql = "SELECT a.id, a.date, a.url, a.title, a.snippet, a.pub_date, a.category, a.summary FROM articles a"
+    where, params = [], []
+    if tag:
+        sql += " JOIN article_tags t ON t.article_id = a.id"
+        where.append("t.tag = ?")
+        params.append(tag)
+    if category:
+        where.append("a.category = ?")
+        params.append(category)
+    if since:
+        where.append("a.date >= ?")
+        params.append(since)
+    if until:
+        where.append("a.date <= ?")
+        params.append(until)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY a.date DESC, a.id"
+    
+    conn = open_article_db()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+        tags = {}
+        for article_id, tag_name in conn.execute(
+            f"SELECT article_id, tag FROM article_tags WHERE article_id IN ({','.join('?' * len(rows))})"
+            " ORDER BY article_id, position",
+            [row[0] for row in rows],
+        ) if rows else ():
+            tags.setdefault(article_id, []).append(tag_name)
+    finally:
+        conn.close()
+    
+    keys = ("day", "url", "title", "snippet", "date", "category", "summary")
+    return [dict(zip(keys, row[1:]), tags=tags.get(row[0], [])) for row in rows]
+
+def import_json_archive(pattern="archive/data/news_*.json"):
+    """既存の日別JSONを記事DBに取り込む（まとめて1トランザクション）"""
+    paths = sorted(glob.glob(pattern))
+    conn = open_article_db()
+    total = 0
+    try:
+        with conn:
+            for path in paths:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                _store_day(conn, data.get("articles", []), data["date"])
+                total += len(data.get("articles", []))
+    finally:
+        conn.close()
+    print(f"✓ JSON取り込み: {len(paths)}日分 / {total}件 → {CONFIG.article_db}")
+
+def period_counts(period, kind):
+    """週（例 2025-W49）または月（例 2025-12）の件数"""
+    conn = open_article_db()
+    try:
+        rows = conn.execute(
+            "SELECT name, count FROM period_counts WHERE period = ? AND kind = ? ORDER BY count DESC, name",
+            (period, kind),
+        ).fetchall()
+    finally:
+        conn.close()
+    return dict(rows)
+
+def trending(kind, date_str, n=5, window=7, baseline_weeks=4):
+    """直近 window 日と、その前 baseline_weeks 週の週平均を比べた伸び上位 n 件"""
+    end = datetime.strptime(date_str, "%Y-%m-%d")
+    recent_start = (end - timedelta(days=window - 1)).strftime("%Y-%m-%d")
+    base_start = (end - timedelta(days=window * (baseline_weeks + 1) - 1)).strftime("%Y-%m-%d")
+    
+    conn = open_article_db()
+    try:
+        rows = conn.execute(
+            "SELECT name,"
+            " SUM(CASE WHEN day >= ? THEN count ELSE 0 END),"
+            " SUM(CASE WHEN day < ? THEN count ELSE 0 END)"
+            " FROM daily_counts WHERE kind = ? AND day >= ? AND day <= ? GROUP BY name",
+            (recent_start, recent_start, kind, base_start, date_str),
+        ).fetchall()
+    finally:
+        conn.close()
+    
+    ranked = []
+    for name, recent, base in rows:
+        baseline = base / baseline_weeks
+        ranked.append({"name": name, "recent": recent, "baseline": round(baseline, 2),
+                       "growth": round(recent - baseline, 2)})
+    ranked.sort(key=lambda r: (-r["growth"], -r["recent"], r["name"]))
+    return ranked[:n]
+
+# ===========================================================
+# JSON保存
+# ===========================================================
+def save_to_json(articles, date_str):
+    """データをJSONで保存"""
+    archive_dir = "archive/data"
+    os.makedirs(archive_dir, exist_ok=True)
+    
+    # カテゴリとタグの集計
+    categories, tags = count_categories_and_tags(articles)
+    
     data = {
         "date": date_str,
         "articles": articles,
@@ -252,162 +1412,469 @@ def save_to_json(articles, date_str):
         "categories": categories,
         "tags": tags
     }
-    
-    filepath = os.path.join(archive_dir, f"news_{date_str}.json")
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    
-    print(f"✓ データ保存: {filepath}")
+    
+    filepath = os.path.join(archive_dir, f"news_{date_str}.json")
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    
+    print(f"✓ データ保存: {filepath}")
+
+# ===========================================================
+# テンプレート
+# ===========================================================
+_TEMPLATE_VAR = re.compile(r"\{\{(\w+)\}\}")
+_compiled_templates = {}
+
+def compile_template(source):
+    """{{NAME}} 形式のテンプレートを (リテラル, 変数名) の列に分解（テンプレートごとに1回だけ）"""
+    parts = _compiled_templates.get(source)
+    if parts is None:
+        pieces = _TEMPLATE_VAR.split(source)
+        pieces.append(None)
+        parts = list(zip(pieces[0::2], pieces[1::2]))
+        _compiled_templates[source] = parts
+    return parts
+
+def render_template(source, values):
+    """テンプレートを文字列片のジェネレータとして展開（値は文字列か文字列のイテラブル）"""
+    for literal, name in compile_template(source):
+        yield literal
+        if name is not None:
+            value = values[name]
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+def render_to_string(source, values):
+    """テンプレートを1つの文字列に展開"""
+    return "".join(render_template(source, values))
+
+_PRECOMPRESS_EXTS = (".html", ".css", ".js", ".json")
+_brotli = []  # 見つけたエンコーダ（("module", brotli) / ("exe", パス) / None）
+
+def _brotli_encoder():
+    """brotli モジュールか brotli コマンド（どちらも無ければ None）"""
+    if not _brotli:
+        try:
+            import brotli
+            _brotli.append(("module", brotli))
+        except ImportError:
+            exe = shutil.which("brotli")
+            _brotli.append(exe and ("exe", exe))
+    return _brotli[0]
+
+def write_chunks(path, chunks, compress=False):
+    """文字列片を一時ファイルに書き、fsync してから置き換える（書きかけのページを見せない）
+    
+    compress=True（公開するファイル）なら同じ文字列片を .gz（と .br）にも流し込み、
+    静的サーバーがそのまま返せるようにする（precompress が無効なら古いものを消す）
+    """
+    dirname = os.path.dirname(path) or "."
+    compress = compress and path.endswith(_PRECOMPRESS_EXTS)
+    if compress and not CONFIG.precompress:
+        compress = False
+        for variant in (path + ".gz", path + ".br"):
+            if os.path.exists(variant):
+                os.remove(variant)
+    encoder = _brotli_encoder() if compress else None
+    targets = [path] + ([path + ".gz"] if compress else []) + ([path + ".br"] if encoder else [])
+    
+    tmp_paths = []
+    files = []
+    try:
+        for _ in targets:
+            fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".tmp_", suffix=".tmp")
+            tmp_paths.append(tmp_path)
+            files.append(os.fdopen(fd, "wb", buffering=64 * 1024))
+        f = files[0]
+        gz = gzip.GzipFile(filename="", mode="wb", fileobj=files[1], compresslevel=9, mtime=0) if compress else None
+        br = encoder[1].Compressor(quality=11) if encoder and encoder[0] == "module" else None
+        
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            f.write(data)
+            if gz:
+                gz.write(data)
+            if br:
+                files[2].write(br.process(data))
+        f.flush()
+        os.fsync(f.fileno())
+        if gz:
+            gz.close()
+        if br:
+            files[2].write(br.finish())
+        elif encoder:
+            # brotli コマンドには書き終えたファイルを渡す（メモリに載せない）
+            files[2].flush()
+            with open(tmp_paths[0], "rb") as src:
+                subprocess.run([encoder[1], "-c", "-q", "11"], stdin=src, stdout=files[2], check=True)
+        for out in files:
+            out.close()
+        
+        # 圧縮版を先に置き換える（新しいページと古い .gz の組み合わせを見せない）
+        for target, tmp_path in reversed(list(zip(targets, tmp_paths))):
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+    except BaseException:
+        for out in files:
+            out.close()
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+
+def _reflink(src, dst):
+    """copy-on-write の複製（Linux の FICLONE。未対応なら OSError）"""
+    if fcntl is None:
+        raise OSError("reflink not supported")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+
+def link_or_copy(src, dst):
+    """dst を src のハードリンクとして置く（無理ならreflink、最後は通常コピー）。.gz/.br も同様"""
+    for ext in (".gz", ".br"):
+        if os.path.exists(src + ext):
+            link_or_copy(src + ext, dst + ext)
+        elif os.path.exists(dst + ext):
+            os.remove(dst + ext)
+    dirname = os.path.dirname(dst) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".tmp_", suffix=".tmp")
+    os.close(fd)
+    os.remove(tmp_path)
+    try:
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            try:
+                _reflink(src, tmp_path)
+            except OSError:
+                shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def site_values():
+    """全ページ共通のテンプレート変数"""
+    return {
+        "SITE_TITLE": CONFIG.settings.get("site_title", "金次の寺子屋"),
+        "SITE_SUBTITLE": CONFIG.settings.get("site_subtitle", "備忘録"),
+        "SITE_TAGLINE": CONFIG.settings.get("site_tagline", "明日を拓く者への道標"),
+        "AUTHOR_NAME": CONFIG.settings.get("author_name", "金次"),
+        "NOTE_URL": CONFIG.note_url,
+        "LINE_URL": CONFIG.line_url,
+        **asset_values(),
+    }
+
+# ===========================================================
+# 静的アセット（指紋付きファイル名・HTML縮小）
+# ===========================================================
+ASSET_DIR = "assets"
+_assets = {}
+
+def minify_css(css):
+    """コメント・インデント・空行を落とす"""
+    if not CONFIG.minify_html:
+        return css
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    return "".join(line.strip() + "\n" for line in css.splitlines() if line.strip())
+
+def minify_js(js):
+    """インデントと空行、行全体のコメントを落とす（改行は残すので意味は変わらない）"""
+    if not CONFIG.minify_html:
+        return js
+    lines = (line.strip() for line in js.splitlines())
+    return "".join(line + "\n" for line in lines if line and not line.startswith("//"))
+
+def minify_html(chunks):
+    """文字列片を流しながら各行の前後の空白と空行を落とす（改行は空白として残る）"""
+    rest = ""
+    for chunk in chunks:
+        lines = (rest + chunk).split("\n")
+        rest = lines.pop()
+        yield "".join(line.strip() + "\n" for line in lines if line.strip())
+    if rest.strip():
+        yield rest.strip()
+
+def publish_asset(name, content):
+    """content を assets/<名前>.<ハッシュ>.<拡張子> に置き（archive/assets にもリンク）、href を返す"""
+    stem, ext = os.path.splitext(name)
+    filename = f"{stem}.{hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]}{ext}"
+    path = os.path.join(ASSET_DIR, filename)
+    if not os.path.exists(path) or (CONFIG.precompress and not os.path.exists(path + ".gz")):
+        os.makedirs(ASSET_DIR, exist_ok=True)
+        write_chunks(path, [content], compress=True)
+    
+    # Page1 は archive/ にも同じファイルを置くので、どちらからも assets/… で参照できるようにする
+    archived = os.path.join("archive", ASSET_DIR, filename)
+    if not os.path.exists(archived) or (CONFIG.precompress and not os.path.exists(archived + ".gz")):
+        os.makedirs(os.path.dirname(archived), exist_ok=True)
+        link_or_copy(path, archived)
+    return f"{ASSET_DIR}/{filename}"
+
+def asset_values():
+    """ページから参照するCSS/JSのhref（内容が変わればファイル名も変わるので長期キャッシュできる）"""
+    try:
+        st = os.stat("style.css")
+        style = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        style = None
+    key = (style, CONFIG.minify_html, CONFIG.precompress)
+    if _assets.get("key") != key:
+        values = {"STYLE_CSS": "style.css"}
+        if style:
+            with open("style.css", "r", encoding="utf-8") as f:
+                values["STYLE_CSS"] = publish_asset("style.css", minify_css(f.read()))
+        values["NEWS_CSS"] = publish_asset("news.css", minify_css(NEWS_CSS))
+        values["NEWS_JS"] = publish_asset("news.js", minify_js(NEWS_JS))
+        values["SEARCH_JS"] = publish_asset("search.js", minify_js(SEARCH_JS))
+        _assets.update(key=key, values=values)
+    return _assets["values"]
+
+# Page1 の見た目と絞り込み（assets/ に指紋付きで書き出して参照する）
+NEWS_CSS = '''/* タブとフィルタ */
+.tabs {
+  display: flex;
+  gap: 8px;
+  margin-bottom: 16px;
+  flex-wrap: wrap;
+}
+.tab-btn, .filter-btn {
+  padding: 8px 16px;
+  border: 1px solid #D1D5DB;
+  background: #F9FAFB;
+  border-radius: 20px;
+  cursor: pointer;
+  font-size: 0.9rem;
+  transition: all 0.2s;
+}
+.tab-btn:hover, .filter-btn:hover {
+  background: #E5E7EB;
+}
+.tab-btn.active {
+  background: #C7463C;
+  color: white;
+  border-color: #C7463C;
+}
+.filter-btn.active {
+  background: #D6B86A;
+  color: white;
+  border-color: #D6B86A;
+}
+/* タグチップ */
+.tags-container {
+  display: flex;
+  gap: 6px;
+  margin: 8px 0;
+  flex-wrap: wrap;
+}
+.tag-chip {
+  display: inline-block;
+  padding: 4px 10px;
+  background: rgba(214, 184, 106, 0.15);
+  color: #D6B86A;
+  border-radius: 12px;
+  font-size: 0.75rem;
+  font-weight: 600;
+}
+/* AI要約 */
+.ai-summary {
+  margin: 6px 0;
+  font-size: 0.85rem;
+  color: #4B5563;
+}
+/* カードフッター */
+.card-footer {
+  display: flex;
+  gap: 12px;
+  margin-top: 8px;
+}
+.share-x {
+  color: #1DA1F2;
+  font-size: 0.85rem;
+  font-weight: 600;
+}
+/* カード表示制御 */
+.card.hidden {
+  display: none;
+}
+/* 画面外のカードは描画を後回しにする（長い一覧向け） */
+.card {
+  content-visibility: auto;
+  contain-intrinsic-size: auto 240px;
+}
+'''
+
+NEWS_JS = '''// 生成時に埋め込んだ索引：カテゴリ → カード番号、タグ → ビットセット（32bit単位）
+// クリックのたびにカードを走査せず、表示が変わるカードだけ class を切り替える
+const index = JSON.parse(document.getElementById('filter-index').textContent);
+const cards = document.querySelectorAll('.card');
+const WORDS = Math.ceil(cards.length / 32);
+
+const ALL = new Uint32Array(WORDS).fill(0xFFFFFFFF);
+if (cards.length % 32) ALL[WORDS - 1] = (2 ** (cards.length % 32)) - 1;
+let visible = ALL;
+
+function show(next) {
+  for (let w = 0; w < WORDS; w++) {
+    let diff = (visible[w] ^ next[w]) >>> 0;
+    while (diff) {
+      const low = diff & -diff;
+      const i = w * 32 + 31 - Math.clz32(low);
+      cards[i].classList.toggle('hidden', !(next[w] & low));
+      diff = (diff ^ low) >>> 0;
+    }
+  }
+  visible = next;
+}
+
+// カテゴリフィルタ
+const tabBtns = document.querySelectorAll('.tab-btn');
+
+tabBtns.forEach(btn => {
+  btn.addEventListener('click', () => {
+    // アクティブ状態切り替え
+    tabBtns.forEach(b => b.classList.remove('active'));
+    btn.classList.add('active');
+
+    const filter = btn.dataset.filter;
+    if (filter === 'all') {
+      show(ALL);
+      return;
+    }
+    const next = new Uint32Array(WORDS);
+    (index.categories[filter] || []).forEach(i => { next[i >>> 5] |= 1 << (i & 31); });
+    show(next);
+  });
+});
 
-# ===========================================================
-# Page1生成（ニュース一覧）
-# ===========================================================
-def build_page1(articles, date_str):
-    """Page1: ニュース一覧ページを生成"""
-    
-    # カード生成（重要：data-category と data-tags を埋め込む）
-    cards_html = ""
-    for a in articles:
-        category = a.get("category", "その他")
-        tags = a.get("tags", [])
-        class_name = category_to_class(category)
-        
-        snippet = a['snippet'].replace('<', '&lt;').replace('>', '&gt;')
-        if len(snippet) > 150:
-            snippet = snippet[:150] + "..."
-        
-        # タグをカンマ区切りで
-        tags_str = ",".join(tags) if tags else ""
-        
-        # タグチップHTML
-        tags_html = ""
-        for tag in tags:
-            tags_html += f'<span class="tag-chip">{tag}</span>'
-        
-        # X共有ボタン
-        share_text = f"{a['title']} {a['url']}"
-        share_url = f"https://twitter.com/intent/tweet?text={requests.utils.quote(share_text)}"
-        
-        kinji_comment = pick_unique_comment(category)
-        
-        cards_html += f'''      <article class="card {class_name}"
-               data-category="{category}"
-               data-tags="{tags_str}">
-        <span class="category">{category}</span>
-        <h3>{a['title']}</h3>
-        <p class="snippet">{snippet}</p>
-        <div class="tags-container">
-{tags_html}
-        </div>'''
-        
-        if kinji_comment:
-            cards_html += f'''
-        <div class="kinji-comment">{kinji_comment}</div>'''
-        
-        cards_html += f'''
-        <div class="card-footer">
-          <a href="{a['url']}" target="_blank">記事を読む →</a>
-          <a href="{share_url}" target="_blank" class="share-x">Xで共有</a>
-        </div>
-        <span class="date">{a['date']}</span>
-      </article>
+// タグフィルタ
+const filterBtns = document.querySelectorAll('.filter-btn');
+
+filterBtns.forEach(btn => {
+  btn.addEventListener('click', () => {
+    btn.classList.toggle('active');
+
+    // アクティブなタグを取得
+    const activeTags = Array.from(filterBtns)
+      .filter(b => b.classList.contains('active'))
+      .map(b => b.dataset.tag);
+
+    if (activeTags.length === 0) {
+      // タグ選択なし = すべて表示
+      show(ALL);
+      return;
+    }
+    // 選択されたタグのいずれかを含むか（ビットセットのOR）
+    const next = new Uint32Array(WORDS);
+    activeTags.forEach(tag => {
+      (index.tags[tag] || []).forEach((bits, w) => { next[w] |= bits; });
+    });
+    show(next);
+  });
+});
 '''
-    
-    # 全カテゴリとタグを抽出
-    all_categories = sorted(list(set([a.get("category", "その他") for a in articles])))
-    all_tags = sorted(list(set([tag for a in articles for tag in a.get("tags", [])])))
-    
-    # カテゴリタブHTML
-    category_tabs = '<button class="tab-btn active" data-filter="all">すべて</button>\n'
-    for cat in all_categories:
-        category_tabs += f'        <button class="tab-btn" data-filter="{cat}">{cat}</button>\n'
-    
-    # タグフィルタHTML
-    tag_filters = ""
-    for tag in all_tags:
-        tag_filters += f'        <button class="filter-btn" data-tag="{tag}">{tag}</button>\n'
-    
-    html = f'''<!DOCTYPE html>
+
+# 検索ページのスクリプト（archive/assets/ から読む）
+SEARCH_JS = '''// search/meta.json：{ segments: [{ dir, shards }, …], docs_per_chunk, doc_count }
+// search/<dir>/XXX.json：{ "2文字": [差分符号化した記事ID…] }（2文字のコードポイントからセグメント内で振り分け）
+// search/docs/*.json：[[タイトル, URL, 日付], …]（記事ID順に meta.docs_per_chunk 件ずつ）
+const MAX_RESULTS = 50;
+const cache = {};
+const load = path => cache[path] || (cache[path] = fetch(path).then(r => r.ok ? r.json() : {}));
+
+function tokens(q) {
+  const chars = Array.from(q.normalize('NFKC').toLowerCase().replace(/[^\\p{L}\\p{N}]+/gu, ''));
+  const set = new Set();
+  for (let i = 0; i + 1 < chars.length; i++) set.add(chars[i] + chars[i + 1]);
+  return [...set];
+}
+
+function decode(deltas) {
+  let id = 0;
+  return deltas.map(d => (id += d));
+}
+
+async function search(q) {
+  const meta = await load('search/meta.json');
+  const toks = tokens(q);
+  if (!toks.length) return null;
+  const segments = meta.segments || [];
+  const lists = await Promise.all(toks.map(async t => {
+    const [a, b] = Array.from(t).map(c => c.codePointAt(0));
+    const parts = await Promise.all(segments.map(async seg => {
+      const shard = await load(`search/${seg.dir}/${((a * 31 + b) % seg.shards).toString(16).padStart(3, '0')}.json`);
+      return decode(shard[t] || []);
+    }));
+    return [...new Set(parts.flat())].sort((x, y) => x - y);
+  }));
+  lists.sort((a, b) => a.length - b.length);
+  let hits = lists[0];
+  for (const list of lists.slice(1)) {
+    const s = new Set(list);
+    hits = hits.filter(id => s.has(id));
+  }
+  hits = hits.reverse().slice(0, MAX_RESULTS);  // 新しい記事から
+  const docs = await Promise.all(hits.map(async id => {
+    const chunk = await load(`search/docs/${Math.floor(id / meta.docs_per_chunk)}.json`);
+    return chunk[id % meta.docs_per_chunk];
+  }));
+  return docs.filter(Boolean);
+}
+
+const input = document.getElementById('searchInput');
+const status = document.getElementById('searchStatus');
+const results = document.getElementById('searchResults');
+
+document.getElementById('searchForm').addEventListener('submit', async e => {
+  e.preventDefault();
+  results.textContent = '';
+  const found = await search(input.value);
+  if (!found) {
+    status.textContent = '2文字以上で検索してください。';
+    return;
+  }
+  status.textContent = `${found.length} 件`;
+  for (const [title, url, day] of found) {
+    const item = document.createElement('div');
+    item.className = 'archive-item';
+    const link = document.createElement('a');
+    link.href = url;
+    link.target = '_blank';
+    const label = document.createElement('span');
+    label.textContent = `${day}　${title}`;
+    const arrow = document.createElement('span');
+    arrow.className = 'archive-arrow';
+    arrow.textContent = '→';
+    link.append(label, arrow);
+    item.append(link);
+    results.append(item);
+  }
+});
+'''
+
+PAGE1_TEMPLATE = '''<!DOCTYPE html>
 <html lang="ja">
 <head>
   <meta charset="utf-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>本日の備忘録 — {date_str} | {SETTINGS.get("site_title", "金次の寺子屋")}</title>
-  <link rel="stylesheet" href="style.css">
-  <style>
-    /* タブとフィルタ */
-    .tabs {{
-      display: flex;
-      gap: 8px;
-      margin-bottom: 16px;
-      flex-wrap: wrap;
-    }}
-    .tab-btn, .filter-btn {{
-      padding: 8px 16px;
-      border: 1px solid #D1D5DB;
-      background: #F9FAFB;
-      border-radius: 20px;
-      cursor: pointer;
-      font-size: 0.9rem;
-      transition: all 0.2s;
-    }}
-    .tab-btn:hover, .filter-btn:hover {{
-      background: #E5E7EB;
-    }}
-    .tab-btn.active {{
-      background: #C7463C;
-      color: white;
-      border-color: #C7463C;
-    }}
-    .filter-btn.active {{
-      background: #D6B86A;
-      color: white;
-      border-color: #D6B86A;
-    }}
-    /* タグチップ */
-    .tags-container {{
-      display: flex;
-      gap: 6px;
-      margin: 8px 0;
-      flex-wrap: wrap;
-    }}
-    .tag-chip {{
-      display: inline-block;
-      padding: 4px 10px;
-      background: rgba(214, 184, 106, 0.15);
-      color: #D6B86A;
-      border-radius: 12px;
-      font-size: 0.75rem;
-      font-weight: 600;
-    }}
-    /* カードフッター */
-    .card-footer {{
-      display: flex;
-      gap: 12px;
-      margin-top: 8px;
-    }}
-    .share-x {{
-      color: #1DA1F2;
-      font-size: 0.85rem;
-      font-weight: 600;
-    }}
-    /* カード表示制御 */
-    .card.hidden {{
-      display: none;
-    }}
-  </style>
+  <title>本日の備忘録 — {{DATE}} | {{SITE_TITLE}}</title>
+  <link rel="stylesheet" href="{{STYLE_CSS}}">
+  <link rel="stylesheet" href="{{NEWS_CSS}}">
 </head>
 <body class="page-news">
 
   <header class="site-header">
     <div class="site-header-inner">
       <div class="site-title-group">
-        <h1 class="logo-main">{SETTINGS.get("site_title", "金次の寺子屋")}</h1>
-        <p class="logo-sub">{SETTINGS.get("site_subtitle", "備忘録")}</p>
+        <h1 class="logo-main">{{SITE_TITLE}}</h1>
+        <p class="logo-sub">{{SITE_SUBTITLE}}</p>
       </div>
       <nav class="site-nav">
         <a href="index.html" class="nav-link">トップ</a>
-        <a href="page2_{date_str}.html" class="nav-link">AI深掘り</a>
+        <a href="page2_{{DATE}}.html" class="nav-link">AI深掘り</a>
         <a href="archive/index.html" class="nav-link">過去の記録</a>
       </nav>
     </div>
@@ -415,24 +1882,24 @@ def build_page1(articles, date_str):
 
   <main class="news-main">
     <div class="page-heading">
-      <h2 class="page-title">本日の備忘録 — {date_str}</h2>
+      <h2 class="page-title">本日の備忘録 — {{DATE}}</h2>
       <p class="page-intro">VTuber業界の動きを記録。日々の糧とせよ。</p>
     </div>
 
     <!-- カテゴリタブ -->
     <div class="tabs">
-{category_tabs}
+{{CATEGORY_TABS}}
     </div>
 
     <!-- タグフィルタ -->
     <div class="tabs" style="margin-top: 8px;">
       <span style="font-size: 0.9rem; color: #6B7280; align-self: center;">タグ：</span>
-{tag_filters}
+{{TAG_FILTERS}}
     </div>
 
     <section class="news-section">
       <div class="cards-container">
-{cards_html}
+{{CARDS}}
       </div>
     </section>
 
@@ -441,122 +1908,68 @@ def build_page1(articles, date_str):
       <div class="callout note-callout">
         <span class="callout-title">📝 noteで詳しく学ぶ</span>
         <p>金次の戦略論・深掘り分析をnoteで公開中。</p>
-        <a href="{NOTE_URL}" target="_blank" class="callout-link">noteを読む →</a>
+        <a href="{{NOTE_URL}}" target="_blank" class="callout-link">noteを読む →</a>
       </div>
       <div class="callout line-callout" style="margin-top:12px;">
         <span class="callout-title">💬 公式LINEで相談</span>
         <p>個別相談・戦略アドバイスはLINEにて。</p>
-        <a href="{LINE_URL}" target="_blank" class="callout-link">LINEを追加 →</a>
+        <a href="{{LINE_URL}}" target="_blank" class="callout-link">LINEを追加 →</a>
       </div>
     </section>
   </main>
 
   <footer class="site-footer">
-    <p>&copy; 2024 {SETTINGS.get("author_name", "金次")} | VTuber備忘録</p>
+    <p>&copy; 2024 {{AUTHOR_NAME}} | VTuber備忘録</p>
   </footer>
 
-  <script>
-    // カテゴリフィルタ
-    const tabBtns = document.querySelectorAll('.tab-btn');
-    const cards = document.querySelectorAll('.card');
-    
-    tabBtns.forEach(btn => {{
-      btn.addEventListener('click', () => {{
-        // アクティブ状態切り替え
-        tabBtns.forEach(b => b.classList.remove('active'));
-        btn.classList.add('active');
-        
-        const filter = btn.dataset.filter;
-        
-        cards.forEach(card => {{
-          if (filter === 'all' || card.dataset.category === filter) {{
-            card.classList.remove('hidden');
-          }} else {{
-            card.classList.add('hidden');
-          }}
-        }});
-      }});
-    }});
-    
-    // タグフィルタ
-    const filterBtns = document.querySelectorAll('.filter-btn');
-    
-    filterBtns.forEach(btn => {{
-      btn.addEventListener('click', () => {{
-        btn.classList.toggle('active');
-        
-        // アクティブなタグを取得
-        const activeTags = Array.from(filterBtns)
-          .filter(b => b.classList.contains('active'))
-          .map(b => b.dataset.tag);
-        
-        cards.forEach(card => {{
-          const cardTags = card.dataset.tags ? card.dataset.tags.split(',') : [];
-          
-          if (activeTags.length === 0) {{
-            // タグ選択なし = すべて表示
-            card.classList.remove('hidden');
-          }} else {{
-            // 選択されたタグのいずれかを含むか
-            const hasTag = activeTags.some(tag => cardTags.includes(tag));
-            if (hasTag) {{
-              card.classList.remove('hidden');
-            }} else {{
-              card.classList.add('hidden');
-            }}
-          }}
-        }});
-      }});
-    }});
-  </script>
+  <script type="application/json" id="filter-index">{{FILTER_INDEX}}</script>
+  <script src="{{NEWS_JS}}"></script>
 
 </body>
 </html>'''
-    
-    filename = f"news_{date_str}.html"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(html)
-    
-    # アーカイブにもコピー
-    archive_dir = "archive"
-    os.makedirs(archive_dir, exist_ok=True)
-    with open(f"{archive_dir}/{filename}", "w", encoding="utf-8") as f:
-        f.write(html)
-    
-    print(f"✓ Page1生成: {filename}")
-    return filename
 
-# ===========================================================
-# Page2生成（AI深掘り）
-# ===========================================================
-def build_page2(articles, ai_analysis, date_str):
-    """Page2: AI深掘りページを生成"""
-    
-    if not ai_analysis:
-        ai_analysis = "※ AI分析は現在利用できません。"
-    
-    # AI分析をHTMLに変換
-    analysis_html = ai_analysis.replace("\n", "<br>")
-    
-    html = f'''<!DOCTYPE html>
+CARD_TEMPLATE = '''      <article class="card {{CLASS_NAME}}"
+               data-category="{{CATEGORY}}"
+               data-tags="{{TAGS}}">
+        <span class="category">{{CATEGORY}}</span>
+        <h3>{{TITLE}}</h3>
+        <p class="snippet">{{SNIPPET}}</p>{{SUMMARY}}
+        <div class="tags-container">
+{{TAG_CHIPS}}
+        </div>{{KINJI}}
+        <div class="card-footer">
+          <a href="{{URL}}" target="_blank">記事を読む →</a>
+          <a href="{{SHARE_URL}}" target="_blank" class="share-x">Xで共有</a>
+        </div>
+        <span class="date">{{DATE}}</span>
+      </article>
+'''
+
+SUMMARY_TEMPLATE = '''
+        <p class="ai-summary">🤖 {{SUMMARY}}</p>'''
+
+KINJI_TEMPLATE = '''
+        <div class="kinji-comment">{{COMMENT}}</div>'''
+
+PAGE2_TEMPLATE = '''<!DOCTYPE html>
 <html lang="ja">
 <head>
   <meta charset="utf-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>AI深掘り分析 — {date_str} | {SETTINGS.get("site_title", "金次の寺子屋")}</title>
-  <link rel="stylesheet" href="style.css">
+  <title>AI深掘り分析 — {{DATE}} | {{SITE_TITLE}}</title>
+  <link rel="stylesheet" href="{{STYLE_CSS}}">
 </head>
 <body class="page-news">
 
   <header class="site-header">
     <div class="site-header-inner">
       <div class="site-title-group">
-        <h1 class="logo-main">{SETTINGS.get("site_title", "金次の寺子屋")}</h1>
+        <h1 class="logo-main">{{SITE_TITLE}}</h1>
         <p class="logo-sub">AI深掘り分析</p>
       </div>
       <nav class="site-nav">
         <a href="index.html" class="nav-link">トップ</a>
-        <a href="news_{date_str}.html" class="nav-link">ニュース一覧</a>
+        <a href="news_{{DATE}}.html" class="nav-link">ニュース一覧</a>
         <a href="archive/index.html" class="nav-link">過去の記録</a>
       </nav>
     </div>
@@ -564,56 +1977,44 @@ def build_page2(articles, ai_analysis, date_str):
 
   <main class="news-main">
     <div class="page-heading">
-      <h2 class="page-title">AI深掘り分析 — {date_str}</h2>
+      <h2 class="page-title">AI深掘り分析 — {{DATE}}</h2>
       <p class="page-intro">本日の注目記事をAIが深掘り分析。</p>
     </div>
 
     <section class="news-section">
       <div class="bamc-block" style="line-height: 1.8;">
-{analysis_html}
+{{ANALYSIS}}
       </div>
     </section>
 
     <section class="news-section">
-      <a href="news_{date_str}.html" class="btn-primary">← ニュース一覧に戻る</a>
+      <a href="news_{{DATE}}.html" class="btn-primary">← ニュース一覧に戻る</a>
     </section>
   </main>
 
   <footer class="site-footer">
-    <p>&copy; 2024 {SETTINGS.get("author_name", "金次")} | VTuber備忘録</p>
+    <p>&copy; 2024 {{AUTHOR_NAME}} | VTuber備忘録</p>
   </footer>
 
 </body>
 </html>'''
-    
-    filename = f"page2_{date_str}.html"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(html)
-    
-    print(f"✓ Page2生成: {filename}")
-    return filename
 
-# ===========================================================
-# ポータルとアーカイブ
-# ===========================================================
-def create_portal_page(latest_file):
-    """index.htmlを生成"""
-    html = f'''<!DOCTYPE html>
+PORTAL_TEMPLATE = '''<!DOCTYPE html>
 <html lang="ja">
 <head>
   <meta charset="utf-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>{SETTINGS.get("site_title", "金次の寺子屋")}</title>
-  <link rel="stylesheet" href="style.css">
+  <title>{{SITE_TITLE}}</title>
+  <link rel="stylesheet" href="{{STYLE_CSS}}">
 </head>
 <body class="page-portal">
 
   <header class="site-header">
     <div class="site-header-inner">
       <div class="site-title-group">
-        <h1 class="logo-main">{SETTINGS.get("site_title", "金次の寺子屋")}</h1>
-        <p class="logo-sub">{SETTINGS.get("site_subtitle", "備忘録")}</p>
-        <p class="logo-tagline">{SETTINGS.get("site_tagline", "明日を拓く者への道標")}</p>
+        <h1 class="logo-main">{{SITE_TITLE}}</h1>
+        <p class="logo-sub">{{SITE_SUBTITLE}}</p>
+        <p class="logo-tagline">{{SITE_TAGLINE}}</p>
       </div>
     </div>
   </header>
@@ -626,102 +2027,728 @@ def create_portal_page(latest_file):
         タグフィルタとAI深掘りで、個人勢VTuberの成長を支援する。
       </p>
       <div class="hero-actions">
-        <a href="{latest_file}" class="btn-primary">本日の備忘録を見る</a>
+        <a href="{{LATEST_FILE}}" class="btn-primary">本日の備忘録を見る</a>
         <a href="archive/index.html" class="btn-secondary">過去の記録</a>
       </div>
     </div>
   </main>
 
   <footer class="site-footer">
-    <p>&copy; 2024 {SETTINGS.get("author_name", "金次")} | VTuber備忘録</p>
+    <p>&copy; 2024 {{AUTHOR_NAME}} | VTuber備忘録</p>
   </footer>
 
 </body>
 </html>'''
-    
-    with open("index.html", "w", encoding="utf-8") as f:
-        f.write(html)
-    
-    print("✓ ポータルページ作成: index.html")
 
-def create_archive_index():
-    """アーカイブ一覧ページを生成"""
-    archive_dir = "archive"
-    files = sorted([f for f in os.listdir(archive_dir) if f.startswith("news_") and f.endswith(".html")], reverse=True)
-    
-    html = f'''<!DOCTYPE html>
+ARCHIVE_INDEX_TEMPLATE = '''<!DOCTYPE html>
 <html lang="ja">
 <head>
   <meta charset="utf-8">
-  <title>過去の記録 | {SETTINGS.get("site_title", "金次の寺子屋")}</title>
-  <link rel="stylesheet" href="../style.css">
+  <title>過去の記録 | {{SITE_TITLE}}</title>
+  <link rel="stylesheet" href="{{STYLE_CSS}}">
 </head>
 <body>
   <header class="site-header">
     <div class="site-header-inner">
-      <h1 class="logo-main">過去の備忘録</h1>
+      <h1 class="logo-main">{{HEADING}}</h1>
       <nav class="site-nav">
         <a href="../index.html" class="nav-link">トップ</a>
+        <a href="search.html" class="nav-link">検索</a>
       </nav>
     </div>
   </header>
 
   <main class="archive-container">
     <div class="archive-list">
-'''
-    
-    for filename in files:
-        date_str = filename.replace("news_", "").replace(".html", "")
-        html += f'      <div class="archive-item"><a href="{filename}"><span>{date_str} の記録</span><span class="archive-arrow">→</span></a></div>\n'
-    
-    html += '''    </div>
+{{ITEMS}}    </div>
+{{MONTHS}}  </main>
+</body>
+</html>'''
+
+SEARCH_PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html lang="ja">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>記事検索 | {{SITE_TITLE}}</title>
+  <link rel="stylesheet" href="{{STYLE_CSS}}">
+</head>
+<body>
+  <header class="site-header">
+    <div class="site-header-inner">
+      <h1 class="logo-main">過去の記事を検索</h1>
+      <nav class="site-nav">
+        <a href="../index.html" class="nav-link">トップ</a>
+        <a href="index.html" class="nav-link">過去の記録</a>
+      </nav>
+    </div>
+  </header>
+
+  <main class="archive-container">
+    <form id="searchForm">
+      <input type="search" id="searchInput" placeholder="キーワード（2文字以上）" style="width: 100%; padding: 8px 12px; font-size: 1rem;">
+    </form>
+    <p id="searchStatus" style="font-size: 0.9rem; color: #6B7280;"></p>
+    <div class="archive-list" id="searchResults"></div>
   </main>
+
+  <script src="{{SEARCH_JS}}"></script>
 </body>
 </html>'''
+
+# ===========================================================
+# ビルドマニフェスト（入力が前回と同じ出力は書き直さない）
+# ===========================================================
+def build_key(*inputs):
+    """出力を決める入力一式のハッシュ（リストは要素ごとにJSONにしてハッシュへ流し、全体を文字列にしない）"""
+    h = hashlib.sha256()
+    for value in inputs:
+        # 区切りの制御文字はJSONの中には現れない（エスケープされる）
+        h.update(b"\x1e" if isinstance(value, list) else b"\x1d")
+        for part in value if isinstance(value, list) else (value,):
+            h.update(json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+            h.update(b"\x1f")
+    return h.hexdigest()
+
+def source_fingerprint(*parts):
+    """テンプレート文字列と描画関数のソースのハッシュ"""
+    import inspect
+    
+    h = hashlib.sha256()
+    for part in parts:
+        h.update((part if isinstance(part, str) else inspect.getsource(part)).encode("utf-8"))
+    return h.hexdigest()
+
+_render_fingerprint = [None, None]  # (辞書データ, ハッシュ)
+
+def render_fingerprint():
+    """Page1の描画結果を左右する入力（テンプレート・描画コード・辞書）のハッシュ"""
+    data = CONFIG.data
+    if _render_fingerprint[0] is not data:
+        code = source_fingerprint(PAGE1_TEMPLATE, CARD_TEMPLATE, SUMMARY_TEMPLATE, KINJI_TEMPLATE, repr(TAG_RULES),
+                                  category_to_class, KinjiDeck, pick_unique_comment, render_card, build_filter_index, build_page1)
+        dictionary = [CONFIG.keywords, CONFIG.kinji_comments, CONFIG.settings.get("default_category"), site_values()]
+        _render_fingerprint[:] = [data, build_key(code, dictionary)]
+    return _render_fingerprint[1]
+
+def open_build_db():
+    """出力パス → 入力ハッシュ の表（rebuild の複数プロセスから書くのでSQLite）"""
+    os.makedirs(CONFIG.cache_dir, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CONFIG.cache_dir, "build.sqlite3"), timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS builds (path TEXT PRIMARY KEY, key TEXT NOT NULL)")
+    return conn
+
+def build_output(path, inputs, render):
+    """inputs が前回と同じで path も残っていれば何もしない。変わっていれば render() の文字列片を書き出して True"""
+    key = build_key(*inputs, CONFIG.minify_html, CONFIG.precompress)
+    path = os.path.normpath(path)
+    conn = open_build_db()
+    try:
+        row = conn.execute("SELECT key FROM builds WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == key and os.path.exists(path):
+            return False
+        chunks = render()
+        if CONFIG.minify_html and path.endswith(".html"):
+            chunks = minify_html(chunks)
+        write_chunks(path, chunks, compress=True)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO builds (path, key) VALUES (?, ?)", (path, key))
+        return True
+    finally:
+        conn.close()
+
+def forget_builds(paths):
+    """次回は入力が同じでも書き直させる"""
+    conn = open_build_db()
+    try:
+        with conn:
+            conn.executemany("DELETE FROM builds WHERE path = ?", [(os.path.normpath(p),) for p in paths])
+    finally:
+        conn.close()
+
+# ===========================================================
+# Page1生成（ニュース一覧）
+# ===========================================================
+def render_card(a):
+    """記事カード1枚分のHTML（重要：data-category と data-tags を埋め込む）"""
+    category = a.get("category", "その他")
+    tags = a.get("tags", [])
+    
+    snippet = a['snippet'].replace('<', '&lt;').replace('>', '&gt;')
+    if len(snippet) > 150:
+        snippet = snippet[:150] + "..."
+    
+    # X共有ボタン
+    share_text = f"{a['title']} {a['url']}"
+    share_url = f"https://twitter.com/intent/tweet?text={quote(share_text)}"
+    
+    kinji_comment = pick_unique_comment(category)
+    summary = a.get("summary", "").replace('<', '&lt;').replace('>', '&gt;')
+    
+    return render_to_string(CARD_TEMPLATE, {
+        "CLASS_NAME": category_to_class(category),
+        "CATEGORY": category,
+        "TAGS": ",".join(tags),
+        "TITLE": a['title'],
+        "SNIPPET": snippet,
+        "SUMMARY": render_to_string(SUMMARY_TEMPLATE, {"SUMMARY": summary}) if summary else "",
+        "TAG_CHIPS": "".join(f'<span class="tag-chip">{tag}</span>' for tag in tags),
+        "KINJI": render_to_string(KINJI_TEMPLATE, {"COMMENT": kinji_comment}) if kinji_comment else "",
+        "URL": a['url'],
+        "SHARE_URL": share_url,
+        "DATE": a['date'],
+    })
+
+def build_filter_index(articles):
+    """絞り込み用の索引：カテゴリ → カード番号の一覧、タグ → 32bit単位のビットセット"""
+    categories = {}
+    tag_bits = {}
+    for i, a in enumerate(articles):
+        categories.setdefault(a.get("category", "その他"), []).append(i)
+        for tag in a.get("tags", []):
+            tag_bits[tag] = tag_bits.get(tag, 0) | (1 << i)
     
-    with open(f"{archive_dir}/index.html", "w", encoding="utf-8") as f:
-        f.write(html)
+    words = (len(articles) + 31) // 32
+    tags = {tag: [(bits >> (32 * w)) & 0xFFFFFFFF for w in range(words)] for tag, bits in tag_bits.items()}
+    data = json.dumps({"categories": categories, "tags": tags}, ensure_ascii=False, separators=(",", ":"))
+    return data.replace("</", "<\\/")
+
+def build_page1(articles, date_str, historical=False):
+    """Page1: ニュース一覧ページを生成（記事と描画の入力が前回と同じなら書き直さない）
+    
+    historical=True（過去分の再生成）なら archive/ にだけ書き、金次コメントの続き位置も使わない
+    """
+    
+    def render():
+        # 全カテゴリとタグを抽出
+        all_categories = sorted(set(a.get("category", "その他") for a in articles))
+        all_tags = sorted(set(tag for a in articles for tag in a.get("tags", [])))
+        
+        # カテゴリタブHTML
+        category_tabs = ['<button class="tab-btn active" data-filter="all">すべて</button>\n']
+        category_tabs += [f'        <button class="tab-btn" data-filter="{cat}">{cat}</button>\n' for cat in all_categories]
+        
+        # タグフィルタHTML
+        tag_filters = [f'        <button class="filter-btn" data-tag="{tag}">{tag}</button>\n' for tag in all_tags]
+        
+        values = site_values()
+        values.update({
+            "DATE": date_str,
+            "CATEGORY_TABS": category_tabs,
+            "TAG_FILTERS": tag_filters,
+            "CARDS": (render_card(a) for a in articles),  # 書き出しながら1枚ずつ生成
+            "FILTER_INDEX": build_filter_index(articles),
+        })
+        return render_template(PAGE1_TEMPLATE, values)
+    
+    filename = f"news_{date_str}.html"
+    archive_dir = "archive"
+    os.makedirs(archive_dir, exist_ok=True)
+    if historical:
+        filename = f"{archive_dir}/{filename}"
+    deck = start_kinji_rotation(date_str, historical)
+    written = build_output(filename, (render_fingerprint(), date_str, articles, deck.seed, deck.start), render)
+    if written and not historical:
+        finish_kinji_rotation(date_str)
+    
+    # アーカイブにはリンク（もう一度書き出さない）
+    if not historical and (written or not os.path.exists(f"{archive_dir}/{filename}")):
+        link_or_copy(filename, f"{archive_dir}/{filename}")
+    
+    print(f"✓ Page1生成: {filename}" if written else f"✓ Page1は変更なし: {filename}")
+    return filename
+
+# ===========================================================
+# Page2生成（AI深掘り）
+# ===========================================================
+def build_page2(articles, ai_analysis, date_str):
+    """Page2: AI深掘りページを生成"""
+    
+    if not ai_analysis:
+        ai_analysis = "※ AI分析は現在利用できません。"
+    
+    values = site_values()
+    values.update({
+        "DATE": date_str,
+        "ANALYSIS": ai_analysis.replace("\n", "<br>"),  # AI分析をHTMLに変換
+    })
+    
+    filename = f"page2_{date_str}.html"
+    written = build_output(filename, (source_fingerprint(PAGE2_TEMPLATE), values),
+                           lambda: render_template(PAGE2_TEMPLATE, values))
+    
+    print(f"✓ Page2生成: {filename}" if written else f"✓ Page2は変更なし: {filename}")
+    return filename
+
+# ===========================================================
+# ポータルとアーカイブ
+# ===========================================================
+def create_portal_page(latest_file):
+    """index.htmlを生成"""
+    values = site_values()
+    values["LATEST_FILE"] = latest_file
+    written = build_output("index.html", (source_fingerprint(PORTAL_TEMPLATE), values),
+                           lambda: render_template(PORTAL_TEMPLATE, values))
+    
+    print("✓ ポータルページ作成: index.html" if written else "✓ ポータルページは変更なし: index.html")
+
+def load_archive_manifest():
+    """アーカイブ済みの日付一覧（昇順）。無ければ一度だけディレクトリから作る"""
+    try:
+        with open(ARCHIVE_MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)["days"], False
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        files = [f for f in os.listdir("archive") if f.startswith("news_") and f.endswith(".html")]
+        return sorted(f[len("news_"):-len(".html")] for f in files), True
+
+def save_archive_manifest(days):
+    """日付一覧を書き出す"""
+    tmp_path = ARCHIVE_MANIFEST + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"days": days}, f)
+    os.replace(tmp_path, ARCHIVE_MANIFEST)
+
+def _archive_items(days):
+    """日付ごとのリンク（新しい順）"""
+    for date_str in reversed(days):
+        yield f'      <div class="archive-item"><a href="news_{date_str}.html"><span>{date_str} の記録</span><span class="archive-arrow">→</span></a></div>\n'
+
+def _month_label(month):
+    year, mon = month.split("-")
+    return f"{year}年{int(mon)}月"
+
+def _write_archive_page(path, heading, days, months_html):
+    values = site_values()
+    values.update({"HEADING": heading, "ITEMS": _archive_items(days), "MONTHS": months_html})
+    inputs = (source_fingerprint(ARCHIVE_INDEX_TEMPLATE, _archive_items), site_values(), heading, days, months_html)
+    return build_output(path, inputs, lambda: render_template(ARCHIVE_INDEX_TEMPLATE, values))
+
+def create_stats_json(date_str, path="stats.json"):
+    """集計済みの件数からカテゴリ・タグ統計のJSONを生成（履歴の長さに依らず一定時間）"""
+    week, month = _periods(date_str)
+    conn = open_article_db()
+    try:
+        daily = conn.execute("SELECT kind, name, count FROM daily_counts WHERE day = ?", (date_str,)).fetchall()
+    finally:
+        conn.close()
+    
+    stats = {
+        "date": date_str,
+        "daily": {kind: {name: count for k, name, count in daily if k == kind} for kind in ("category", "tag")},
+        "weekly": {"period": week, **{kind: period_counts(week, kind) for kind in ("category", "tag")}},
+        "monthly": {"period": month, **{kind: period_counts(month, kind) for kind in ("category", "tag")}},
+        "trending": {kind: trending(kind, date_str) for kind in ("category", "tag")},
+    }
+    write_chunks(path, [json.dumps(stats, ensure_ascii=False)], compress=True)
+    print(f"✓ 統計JSON作成: {path}")
+
+def create_archive_index(*dates):
+    """アーカイブ一覧ページを生成（月別ページに分割し、dates の月だけ書き直す。dates が無ければ全部）"""
+    archive_dir = "archive"
+    os.makedirs(archive_dir, exist_ok=True)
+    days, rebuild = load_archive_manifest()
     
+    for date_str in dates:
+        i = bisect.bisect_left(days, date_str)
+        if i == len(days) or days[i] != date_str:
+            days.insert(i, date_str)
+    
+    by_month = {}
+    for day in days:
+        by_month.setdefault(day[:7], []).append(day)
+    months = sorted(by_month, reverse=True)
+    
+    # 月別ページ：新しい日が入った月だけ（マニフェストが無いときは全部）
+    targets = months if rebuild or not dates else sorted({date_str[:7] for date_str in dates})
+    back_link = '    <a href="index.html" class="back-button">← 月別一覧に戻る</a>\n'
+    for month in targets:
+        _write_archive_page(f"{archive_dir}/index_{month}.html",
+                            f"過去の備忘録 — {_month_label(month)}", by_month[month], back_link)
+    
+    # index.html：最新月の記録と月別一覧
+    month_links = [
+        '    <h2 class="section-title" style="margin-top: 24px;">月別</h2>\n',
+        '    <div class="archive-list">\n',
+    ]
+    month_links += [
+        f'      <div class="archive-item"><a href="index_{month}.html"><span>{_month_label(month)}（{len(by_month[month])}日）</span><span class="archive-arrow">→</span></a></div>\n'
+        for month in months
+    ]
+    month_links.append('    </div>\n')
+    _write_archive_page(f"{archive_dir}/index.html", "過去の備忘録",
+                        by_month[months[0]] if months else [], month_links)
+    
+    save_archive_manifest(days)
     print("✓ アーカイブインデックス作成")
 
 # ===========================================================
-# メイン
+# 全文検索インデックス（静的シャード）
 # ===========================================================
-def main():
-    print("\n========== VTuberニュースサイト完全版生成 ==========")
+def search_tokens(text):
+    """検索用トークン（正規化した本文の文字bigram）"""
+    text = re.sub(r"[\W_]+", "", unicodedata.normalize("NFKC", text).lower())
+    if len(text) < 2:
+        return set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def search_shard(token, shards):
+    """bigramの2文字から決まるシャード番号（search.html と同じ式）"""
+    return (ord(token[0]) * 31 + ord(token[1])) % shards
+
+def _shard_path(segment, shard_id):
+    return os.path.join(SEARCH_DIR, segment["dir"], f"{shard_id:03x}.json")
+
+def _load_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def _write_json(path, data, compress=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_chunks(path, [json.dumps(data, ensure_ascii=False, separators=(",", ":"))], compress)
+
+def load_search_meta():
+    """meta.json（無ければ空のインデックス）"""
+    return _load_json(os.path.join(SEARCH_DIR, "meta.json"), None) or {
+        "docs_per_chunk": SEARCH_DOCS_PER_CHUNK, "doc_count": 0, "segments": [],
+    }
+
+def _read_segment(segment):
+    """セグメントの全シャードを bigram → 記事IDの一覧 に戻す"""
+    postings = {}
+    for shard_id in range(segment["shards"]):
+        for token, deltas in _load_json(_shard_path(segment, shard_id), {}).items():
+            ids = postings.setdefault(token, [])
+            for d in deltas:
+                ids.append((ids[-1] if ids else 0) + d)
+    return postings
+
+def _write_segment(dirname, postings):
+    """postings を新しいディレクトリにシャード分けして書き、meta に載せるセグメント情報を返す"""
+    total = sum(len(ids) for ids in postings.values())
+    shards = 1
+    while shards < CONFIG.search_shards and total > shards * SEARCH_POSTINGS_PER_SHARD:
+        shards *= 2
     
-    # ① ニュース取得
-    articles_all = fetch_all_news()
-    articles = dedupe_articles(articles_all)
+    split = {}
+    for token, ids in postings.items():
+        deltas, last = [], 0
+        for doc_id in sorted(set(ids)):
+            deltas.append(doc_id - last)
+            last = doc_id
+        split.setdefault(search_shard(token, shards), {})[token] = deltas
     
-    if not articles:
-        print("❌ ニュースが取得できませんでした")
+    segment = {"dir": dirname, "shards": shards}
+    shutil.rmtree(os.path.join(SEARCH_DIR, dirname), ignore_errors=True)  # 前回途中で止まった書きかけ
+    for shard_id, shard in split.items():
+        _write_json(_shard_path(segment, shard_id), shard, compress=True)
+    return segment
+
+def _write_search_meta(meta):
+    _write_json(os.path.join(SEARCH_DIR, "meta.json"), meta, compress=True)
+
+def _sync_search_docs(conn, doc_count):
+    """search_docs を meta.json の記事数に合わせる（meta.json を書いた直後に止まった回の分を docs から戻す）
+    
+    合わせられない（インデックスが消された・欠けている）ときは RuntimeError
+    """
+    indexed = conn.execute("SELECT COALESCE(MAX(doc_id) + 1, 0) FROM search_docs").fetchone()[0]
+    if indexed > doc_count:
+        raise RuntimeError(f"search_docs（{indexed}件）が検索インデックス（{doc_count}件）より先に進んでいます")
+    rows = []
+    for doc_id in range(indexed, doc_count):
+        chunk_id, i = divmod(doc_id, SEARCH_DOCS_PER_CHUNK)
+        chunk = _load_json(os.path.join(SEARCH_DIR, "docs", f"{chunk_id}.json"), [])
+        if i >= len(chunk):
+            raise RuntimeError(f"検索インデックスの記事 {doc_id} が docs/{chunk_id}.json にありません")
+        rows.append((chunk[i][1], doc_id))
+    if rows:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO search_docs (url, doc_id) VALUES (?, ?)", rows)
+
+def _append_search_docs(next_id, new_docs):
+    """記事情報を docs チャンクの末尾に足す（meta.json に載る前に止まった回の残りは切り捨てる）"""
+    chunks = {}
+    for doc_id, url, a, day in new_docs:
+        chunks.setdefault(doc_id // SEARCH_DOCS_PER_CHUNK, []).append([a["title"], url, day])
+    for chunk_id, docs in chunks.items():
+        path = os.path.join(SEARCH_DIR, "docs", f"{chunk_id}.json")
+        chunk = _load_json(path, [])
+        offset = max(next_id - chunk_id * SEARCH_DOCS_PER_CHUNK, 0)
+        if len(chunk) < offset:
+            raise RuntimeError(f"{path} は {len(chunk)}件で、記事 {next_id} の前が欠けています")
+        del chunk[offset:]
+        chunk.extend(docs)
+        _write_json(path, chunk, compress=True)
+
+def _merge_search_segments(meta, date_str):
+    """前の月の日セグメント（今月も溜まりすぎたら今月分）を月セグメントに書き直す"""
+    month = date_str[:7]
+    days = [seg for seg in meta["segments"] if "day" in seg]
+    months = {seg["day"][:7] for seg in days if seg["day"][:7] != month}
+    if sum(seg["day"][:7] == month for seg in days) > CONFIG.search_day_segments:
+        months.add(month)
+    if not months:
         return
     
-    # ② カテゴリとタグを付与
-    print("\n▶ カテゴリ・タグ分析中...")
+    kept, removed = [], []
+    for seg in meta["segments"]:
+        (removed if (seg.get("month") or seg.get("day", "")[:7]) in months else kept).append(seg)
+    for m in sorted(months):
+        postings = {}
+        for seg in removed:
+            if (seg.get("month") or seg["day"][:7]) == m:
+                for token, ids in _read_segment(seg).items():
+                    postings.setdefault(token, []).extend(ids)
+        segment = _write_segment(f"segments/{m}.{meta['doc_count']}", postings)
+        segment["month"] = m
+        kept.append(segment)
+    meta["segments"] = kept
+    _write_search_meta(meta)
+    
+    # 載らなくなったセグメントを消す（書き込み中に止まって残ったものも）
+    live = {seg["dir"] for seg in kept}
+    segments_dir = os.path.join(SEARCH_DIR, "segments")
+    for name in os.listdir(segments_dir):
+        if f"segments/{name}" not in live:
+            shutil.rmtree(os.path.join(segments_dir, name), ignore_errors=True)
+    print(f"✓ 検索インデックスの月セグメント更新: {', '.join(sorted(months))}")
+
+def _add_search_docs(conn, meta, dated_articles, name, label):
+    """まだ索引にない記事を新しいセグメント segments/<name>.<先頭ID> として追加し、追加件数を返す"""
+    next_id = meta["doc_count"]
+    new_docs = []
+    seen_urls = set()
+    for day, a in dated_articles:
+        url = canonicalize_url(a["url"])
+        if url in seen_urls or conn.execute("SELECT 1 FROM search_docs WHERE url = ?", (url,)).fetchone():
+            continue
+        seen_urls.add(url)
+        new_docs.append((next_id + len(new_docs), url, a, day))
+    if not new_docs:
+        return 0
+    
+    _append_search_docs(next_id, new_docs)
+    postings = {}
+    for doc_id, _, a, _ in new_docs:
+        for token in search_tokens(a["title"] + " " + a["snippet"]):
+            postings.setdefault(token, []).append(doc_id)
+    segment = _write_segment(f"segments/{name}.{next_id}", postings)
+    segment.update(label)
+    meta["segments"].append(segment)
+    meta["doc_count"] = next_id + len(new_docs)
+    _write_search_meta(meta)
+    
+    with conn:
+        conn.executemany("INSERT INTO search_docs (url, doc_id) VALUES (?, ?)",
+                         [(url, doc_id) for doc_id, url, _, _ in new_docs])
+    return len(new_docs)
+
+def _reset_search_index(conn):
+    """検索インデックスを消し、記事DBの全記事から月セグメントとして作り直す"""
+    shutil.rmtree(SEARCH_DIR, ignore_errors=True)
+    with conn:
+        conn.execute("DELETE FROM search_docs")
+    meta = load_search_meta()
+    by_month = {}
+    for day, url, title, snippet in conn.execute("SELECT date, url, title, snippet FROM articles ORDER BY date, id"):
+        by_month.setdefault(day[:7], []).append((day, {"url": url, "title": title, "snippet": snippet}))
+    for month, rows in sorted(by_month.items()):
+        _add_search_docs(conn, meta, rows, month, {"month": month})
+    return meta
+
+def update_search_index(articles, date_str):
+    """新しい記事だけを転置インデックスに追加する
+    
+    追加分は新しい日セグメント（通常は1ファイル）として書き、既存のシャードは書き直さない。
+    前の月の日セグメントは月セグメントにまとめる。公開の区切りは meta.json の置き換えで、
+    search_docs への記録はその後（途中で止まっても次回 meta.json と docs から合わせ直す）。
+    インデックスが消されたり欠けたりしていたら、記事DBから作り直して続ける。
+    """
+    meta = load_search_meta()
+    conn = open_article_db()
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS search_docs (url TEXT PRIMARY KEY, doc_id INTEGER NOT NULL)")
+        dated = [(date_str, a) for a in articles]
+        try:
+            _sync_search_docs(conn, meta["doc_count"])
+            added = _add_search_docs(conn, meta, dated, date_str, {"day": date_str})
+        except RuntimeError as e:
+            print(f"⚠ 検索インデックスを記事DBから作り直します: {e}")
+            meta = _reset_search_index(conn)
+            added = meta["doc_count"]
+            added += _add_search_docs(conn, meta, dated, date_str, {"day": date_str})
+        
+        _merge_search_segments(meta, date_str)
+    finally:
+        conn.close()
+    
+    print(f"✓ 検索インデックス更新: +{added}件")
+
+def create_search_page():
+    """archive/search.html を生成"""
+    values = site_values()
+    build_output("archive/search.html", (source_fingerprint(SEARCH_PAGE_TEMPLATE), values),
+                 lambda: render_template(SEARCH_PAGE_TEMPLATE, values))
+
+# ===========================================================
+# 過去ページの再生成（日別JSONから）
+# ===========================================================
+def _file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _rebuild_day(path):
+    """1日分を今の辞書で分類し直し、日別JSONと archive/ のPage1を書き直す（プロセスプールで実行）"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    articles = data.get("articles", [])
     for a in articles:
-        a["category"] = classify_by_keyword(a["title"], a["snippet"])
-        a["tags"] = extract_tags(a["title"], a["snippet"])
+        a["category"], a["tags"] = match_article(a["title"], a["snippet"])
+    
+    with redirect_stdout(StringIO()):
+        save_to_json(articles, data["date"])
+        build_page1(articles, data["date"], historical=True)
+    return path, data["date"], articles, _file_sha256(path)
+
+def rebuild_archive(pattern="archive/data/news_*.json", workers=None, force=False):
+    """日別JSONから過去のPage1を並列に再生成（JSONと描画の入力が前回と同じ日は省略）"""
+    started = time.perf_counter()
+    state_path = os.path.join(CONFIG.cache_dir, "rebuild.json")
+    state = _load_json(state_path, {})
+    # 描画コード・辞書に加え、出力を変える設定（縮小・事前圧縮・過去分の金次コメントの seed）
+    fingerprint = build_key(render_fingerprint(), CONFIG.minify_html, CONFIG.precompress, CONFIG.kinji_seed)
+    
+    paths = sorted(glob.glob(pattern))
+    todo = []
+    for path in paths:
+        page = os.path.join("archive", os.path.basename(path)[:-len(".json")] + ".html")
+        done = state.get(os.path.basename(path))
+        if force or not os.path.exists(page) or done != [fingerprint, _file_sha256(path)]:
+            todo.append(path)
+    
+    print(f"▶ 過去ページ再生成: {len(todo)}日（変更なし {len(paths) - len(todo)}日）")
+    if not todo:
+        return
+    
+    if force:
+        forget_builds(os.path.join("archive", os.path.basename(path)[:-len(".json")] + ".html") for path in todo)
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_rebuild_day, todo, chunksize=max(1, len(todo) // (workers * 4))))
+    else:
+        results = [_rebuild_day(path) for path in todo]
+    
+    # 記事DBの分類と件数も合わせる（書き込みは親プロセスでまとめて）
+    conn = open_article_db()
+    try:
+        with conn:
+            for _, date_str, articles, _ in results:
+                _store_day(conn, articles, date_str)
+    finally:
+        conn.close()
+    
+    for path, _, _, digest in results:
+        state[os.path.basename(path)] = [fingerprint, digest]
+    _write_json(state_path, state)
+    create_archive_index(*(date_str for _, date_str, _, _ in results))
+    print(f"✓ 再生成完了: {len(results)}日（{workers}プロセス、{time.perf_counter() - started:.1f}s）")
+
+# ===========================================================
+# メイン
+# ===========================================================
+def prepare_articles(articles_all, date_str):
+    """取得結果を重複除去・掲載済み除外し、カテゴリとタグを付与する"""
+    with stage("dedupe") as m:
+        articles = dedupe_articles(articles_all)
+        m["items"] = len(articles)
+    with stage("seen_filter") as m:
+        articles = filter_seen_articles(articles, date_str)
+        m["items"] = len(articles)
+    if not articles:
+        return articles
+    
+    print("\n▶ カテゴリ・タグ分析中...")
+    with stage("classify") as m:
+        for a in articles:
+            a["category"], a["tags"] = match_article(a["title"], a["snippet"])
+        m["items"] = len(articles)
     
     print(f"✓ {len(articles)}件の記事を分析完了")
+    return articles
+
+def publish(articles, date_str, new_day=True):
+    """記事からその日のページと派生データを生成して (Page1, Page2) を返す
+    
+    new_day=False ならポータル・アーカイブ一覧・検索ページは作り直さない（同じ日の再生成）
+    """
+    # AI深掘りはバックグラウンドで開始（保存・Page1生成と並行）
+    ai_future = start_ollama_analysis(articles) if USE_OLLAMA else None
+    with stage("summarize") as m:
+        summarize_articles(articles)
+        m["items"] = len(articles)
     
-    # ③ JSON保存
-    date_str = datetime.today().strftime("%Y-%m-%d")
-    save_to_json(articles, date_str)
+    # 記事DB保存（日別JSONはそこからの派生出力）
+    with stage("store") as m:
+        store_articles(articles, date_str)
+        m["items"] = len(articles)
+    with stage("save_json") as m:
+        save_to_json(articles, date_str)
+        m["items"] = len(articles)
     
-    # ④ Page1生成
     print("\n▶ Page1（ニュース一覧）生成中...")
-    page1_file = build_page1(articles, date_str)
+    with stage("page1") as m:
+        page1_file = build_page1(articles, date_str)
+        m["bytes"] = os.path.getsize(page1_file)
     
-    # ⑤ Page2生成（AI深掘り）
+    if new_day:
+        with stage("portal"):
+            create_portal_page(page1_file)
+    with stage("stats"):
+        create_stats_json(date_str)
+    if new_day:
+        with stage("archive_index"):
+            create_archive_index(date_str)
+    with stage("search_index") as m:
+        update_search_index(articles, date_str)
+        m["items"] = len(articles)
+    if new_day:
+        with stage("search_page"):
+            create_search_page()
+    
+    # Page2生成（AI深掘りの完了を待つ）
     print("\n▶ Page2（AI深掘り）生成中...")
-    ai_analysis = analyze_with_ollama_deep(articles) if USE_OLLAMA else None
-    page2_file = build_page2(articles, ai_analysis, date_str)
+    with stage("ollama_wait"):
+        ai_analysis = ai_future.result() if ai_future else None
+    with stage("page2") as m:
+        page2_file = build_page2(articles, ai_analysis, date_str)
+        m["bytes"] = os.path.getsize(page2_file)
+    
+    with stage("mark_seen"):
+        mark_articles_seen(articles, date_str)
+    return page1_file, page2_file
+
+def main():
+    print("\n========== VTuberニュースサイト完全版生成 ==========")
     
-    # ⑥ ポータルとアーカイブ
-    create_portal_page(page1_file)
-    create_archive_index()
+    try:
+        # ① ニュース取得
+        articles_all = fetch_all_news()
+        date_str = datetime.today().strftime("%Y-%m-%d")
+        
+        # ② 重複除去・カテゴリとタグを付与
+        articles = prepare_articles(articles_all, date_str)
+        if not articles:
+            print("❌ ニュースが取得できませんでした")
+            return
+        
+        # ③ ページ生成
+        page1_file, page2_file = publish(articles, date_str)
+    finally:
+        write_metrics()
     
     print("\n" + "=" * 50)
     print(f"✅ 生成完了")
@@ -729,5 +2756,105 @@ def main():
     print(f"  Page2: {page2_file}")
     print("=" * 50)
 
+# ===========================================================
+# 常駐モード（クエリごとの間隔で再取得）
+# ===========================================================
+def query_interval(q):
+    """クエリの再取得間隔（秒）"""
+    return max(1, int(q.get("interval", CONFIG.refresh_interval)))
+
+def article_set_digest(articles, date_str):
+    """ページ内容を決める記事集合のハッシュ"""
+    rows = [[a["url"], a["title"], a["snippet"], a["date"], a["category"], a["tags"]] for a in articles]
+    return hashlib.sha256(json.dumps([date_str, rows], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def serve(max_cycles=None, max_sleep=60):
+    """常駐して期限の来たクエリだけを取り直し、記事集合が変わったときだけページを作り直す
+    
+    セッション・辞書・キャッシュはプロセス内で使い回す。max_cycles は取得回数の上限（Noneで無制限）。
+    """
+    print("\n========== VTuberニュースサイト常駐モード ==========")
+    latest = {}  # search_query -> 直近の取得結果
+    next_due = {}  # search_query -> 次に取得する時刻（monotonic）
+    published = None  # (日付, 記事集合のハッシュ)
+    cycles = 0
+    
+    try:
+        while max_cycles is None or cycles < max_cycles:
+            if CONFIG.is_stale():
+                print(f"\n▶ {DICTIONARY_JSON} の変更を検出、読み直します")
+                CONFIG.reload()
+                next_due.clear()
+                published = None
+            
+            enabled = [q for q in CONFIG.queries if q.get("enabled", False)]
+            now = time.monotonic()
+            due = [q for q in enabled if next_due.get(q.get("search_query", ""), 0) <= now]
+            
+            if due:
+                cycles += 1
+                print(f"\n▶ {datetime.now():%H:%M:%S} {len(due)}/{len(enabled)} クエリを取得")
+                for q, articles in zip(due, fetch_queries(due)):
+                    key = q.get("search_query", "")
+                    latest[key] = articles
+                    next_due[key] = now + query_interval(q)
+                
+                try:
+                    date_str = datetime.today().strftime("%Y-%m-%d")
+                    articles_all = [dict(a) for q in enabled for a in latest.get(q.get("search_query", ""), [])]
+                    articles = prepare_articles(articles_all, date_str)
+                    digest = article_set_digest(articles, date_str)
+                    if not articles:
+                        print("  → 記事がありません")
+                    elif published == (date_str, digest):
+                        print("  → 記事に変化なし、ページ生成を省略")
+                    else:
+                        new_day = published is None or published[0] != date_str
+                        page1_file, page2_file = publish(articles, date_str, new_day=new_day)
+                        published = (date_str, digest)
+                        print(f"✅ 更新: {page1_file} / {page2_file}")
+                except Exception as e:
+                    print(f"⚠ ページ更新に失敗: {e}")
+                write_metrics()
+            
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+            keys = {q.get("search_query", "") for q in enabled}
+            wake = min((t for key, t in next_due.items() if key in keys), default=now + max_sleep)
+            time.sleep(min(max(0.0, wake - time.monotonic()), max_sleep))
+    except KeyboardInterrupt:
+        print("\n▶ 常駐モードを終了します")
+    finally:
+        save_http_cache()
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="VTuberニュースサイト生成")
+    parser.add_argument("--profile", action="append", default=[], metavar="STAGE",
+                        help="ステージを cProfile で計測（.cache/profile/ に保存、all で全部）")
+    parser.add_argument("--trace-memory", action="append", default=[], metavar="STAGE",
+                        help="ステージのメモリ確保を tracemalloc で計測")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("import-json", help="archive/data の日別JSONを記事DBに取り込む")
+    rebuild_parser = commands.add_parser("rebuild", help="archive/data の日別JSONから過去のPage1を作り直す")
+    rebuild_parser.add_argument("--workers", type=int, help="プロセス数（既定はCPU数）")
+    rebuild_parser.add_argument("--force", action="store_true", help="変更のない日も作り直す")
+    serve_parser = commands.add_parser("serve", help="常駐してクエリごとの間隔で更新する")
+    serve_parser.add_argument("--max-sleep", type=float, default=60, help="辞書の変更を確認する間隔（秒）")
+    args = parser.parse_args()
+    PROFILE_STAGES.update(args.profile)
+    TRACE_MEMORY_STAGES.update(args.trace_memory)
+    
+    try:
+        CONFIG.load()
+    except FileNotFoundError:
+        print(f"❌ {DICTIONARY_JSON} が見つかりません")
+        exit(1)
+    
+    if args.command == "import-json":
+        import_json_archive()
+    elif args.command == "rebuild":
+        rebuild_archive(workers=args.workers, force=args.force)
+    elif args.command == "serve":
+        serve(max_sleep=args.max_sleep)
+    else:
+        main()